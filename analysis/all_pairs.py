@@ -0,0 +1,194 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from route_graph import CLEAN_DATA_DIR, bfs_legs, load_route_graph
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "clean_data_columnar"))
+LEGS_FILE = "all_pairs_legs.npy"
+AIRPORT_IDS_FILE = "all_pairs_airport_ids.npy"
+
+# Value of airport pairs that are not connected at all
+UNREACHABLE = 255
+
+# Set before the pool starts so that forked workers share the graph read-only
+_graph = None
+
+
+def _init_worker(clean_data_dir):
+    """Loads the graph in workers that were not forked from a parent that has it."""
+    global _graph
+    if _graph is None:
+        _graph = load_route_graph(clean_data_dir).simple()
+
+
+def _compute_rows(task):
+    """
+    Runs a BFS from every source airport in a range and writes the rows straight
+    into the memory-mapped matrix, so no results travel back through the pool.
+
+    Args:
+        task (tuple): (matrix path, first source index, end source index)
+
+    Returns:
+        int: Number of rows written.
+    """
+    matrix_path, start, end = task
+    legs_matrix = np.load(matrix_path, mmap_mode="r+")
+    out_degrees = _graph.out_degrees()
+    for source in range(start, end):
+        if out_degrees[source] == 0:
+            row = np.full(_graph.num_airports, UNREACHABLE, dtype=np.uint8)
+            row[source] = 0
+        else:
+            legs = bfs_legs(_graph, [source])
+            row = np.where(legs < 0, UNREACHABLE, legs).astype(np.uint8)
+        legs_matrix[source] = row
+    legs_matrix.flush()
+    return end - start
+
+
+def compute_all_pairs(clean_data_dir=CLEAN_DATA_DIR, output_dir=OUTPUT_DIR, num_workers=None, chunk_size=64):
+    """
+    Computes the minimum number of legs between every pair of airports and
+    stores it as a uint8 matrix in a .npy file that can be memory-mapped.
+    Row i, column j holds the legs from airport i to airport j (airports in
+    Airport_ID order, see all_pairs_airport_ids.npy), UNREACHABLE if there is no
+    connection.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+        output_dir (str): Directory for the matrix and the airport IDs.
+        num_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int): Number of source airports per task.
+
+    Returns:
+        str: Path of the matrix, or None if the computation failed.
+    """
+    global _graph
+    num_workers = num_workers or os.cpu_count() or 1
+    try:
+        _graph = load_route_graph(clean_data_dir).simple()
+    except FileNotFoundError as e:
+        print(f"Error: File not found: {e.filename}")
+        return None
+
+    os.makedirs(output_dir, exist_ok=True)
+    matrix_path = os.path.join(output_dir, LEGS_FILE)
+    tmp_matrix_path = os.path.join(output_dir, "tmp_" + LEGS_FILE)
+    n = _graph.num_airports
+    try:
+        legs_matrix = np.lib.format.open_memmap(tmp_matrix_path, mode="w+", dtype=np.uint8, shape=(n, n))
+        del legs_matrix
+        tasks = [(tmp_matrix_path, start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+        with Pool(num_workers, initializer=_init_worker, initargs=(clean_data_dir,)) as pool:
+            rows_written = sum(pool.imap_unordered(_compute_rows, tasks))
+        np.save(os.path.join(output_dir, AIRPORT_IDS_FILE), _graph.airport_ids)
+        os.replace(tmp_matrix_path, matrix_path)
+    except Exception as e:
+        print(f"Error computing all-pairs legs: {e}")
+        if os.path.exists(tmp_matrix_path):
+            os.remove(tmp_matrix_path)
+        return None
+
+    print(f"All-pairs legs for {rows_written} airports written to {matrix_path}")
+    return matrix_path
+
+
+def load_all_pairs(output_dir=OUTPUT_DIR):
+    """
+    Opens the matrix read-only. The pages are shared between all processes that
+    map the file, so every worker can use it without its own copy.
+
+    Args:
+        output_dir (str): Directory written by compute_all_pairs.
+
+    Returns:
+        tuple: (uint8 legs matrix as np.memmap, int32 Airport_ID per row/column)
+    """
+    legs_matrix = np.load(os.path.join(output_dir, LEGS_FILE), mmap_mode="r")
+    airport_ids = np.load(os.path.join(output_dir, AIRPORT_IDS_FILE))
+    return legs_matrix, airport_ids
+
+
+def country_connectivity(legs_matrix, graph, served_only=True):
+    """
+    Aggregates the airport matrix to country pairs.
+
+    Args:
+        legs_matrix (np.ndarray): Matrix from load_all_pairs.
+        graph (RouteGraph): Route graph with the same airports, for their countries.
+        served_only (bool): Only count airports that have at least one route.
+
+    Returns:
+        pd.DataFrame: One row per origin and destination country with min_legs
+        (fewest legs between any two of their airports), mean_legs (over the
+        connected airport pairs) and connected_share (share of airport pairs
+        that are connected at all). Country pairs without any connection are
+        included with min_legs NaN and connected_share 0.
+    """
+    airports = np.flatnonzero(graph.country_codes >= 0)
+    if served_only:
+        served = (graph.out_degrees() > 0) | (np.bincount(graph.indices, minlength=graph.num_airports) > 0)
+        airports = airports[served[airports]]
+
+    # Columns grouped by country, so each country is one reduceat segment
+    airports = airports[np.argsort(graph.country_codes[airports], kind="stable")]
+    codes = graph.country_codes[airports]
+    countries, starts, sizes = np.unique(codes, return_index=True, return_counts=True)
+
+    min_legs, leg_sums, connected = [], [], []
+    for start, size in zip(starts, sizes):
+        block = np.asarray(legs_matrix[airports[start:start + size]][:, airports])
+        reachable = block != UNREACHABLE
+        min_legs.append(np.minimum.reduceat(block.min(axis=0), starts))
+        leg_sums.append(np.add.reduceat(np.where(reachable, block, 0).sum(axis=0, dtype=np.int64), starts))
+        connected.append(np.add.reduceat(reachable.sum(axis=0), starts))
+
+    min_legs, leg_sums, connected = np.array(min_legs), np.array(leg_sums), np.array(connected)
+    pairs = np.outer(sizes, sizes)
+    names = graph.country_names[countries]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return pd.DataFrame({
+            "origin_country": np.repeat(names, len(names)),
+            "destination_country": np.tile(names, len(names)),
+            "min_legs": np.where(min_legs == UNREACHABLE, np.nan, min_legs).ravel(),
+            "mean_legs": (leg_sums / connected).ravel(),
+            "connected_share": (connected / pairs).ravel(),
+        })
+
+
+def country_reach_summary(connectivity_df):
+    """
+    Per-country connectivity index from country_connectivity: how many other
+    countries can be reached at all and with how many legs on average.
+
+    Args:
+        connectivity_df (pd.DataFrame): Result of country_connectivity.
+
+    Returns:
+        pd.DataFrame: country, reachable_countries, mean_min_legs, mean_connected_share.
+    """
+    others = connectivity_df[connectivity_df["origin_country"] != connectivity_df["destination_country"]]
+    return (others.groupby("origin_country")
+            .agg(reachable_countries=("min_legs", "count"),
+                 mean_min_legs=("min_legs", "mean"),
+                 mean_connected_share=("connected_share", "mean"))
+            .rename_axis("country").reset_index())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the all-pairs minimum-legs matrix.")
+    parser.add_argument("--data-dir", default=CLEAN_DATA_DIR, help="directory with the clean CSV files")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="directory for the matrix")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    compute_all_pairs(args.data_dir, args.output_dir, args.workers)
+    print(f"Finished in {time.perf_counter() - start_time:.2f}s")
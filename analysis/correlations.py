@@ -0,0 +1,299 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from embedded_engine import TABLES
+from route_graph import CLEAN_DATA_DIR, load_route_graph, pagerank
+
+# Network metrics per country, computed from the route graph
+METRICS = ["outgoing_routes", "unique_airlines", "reachable_countries", "domestic_share", "hub_centrality"]
+# Economic indicators per country, from the countries table
+INDICATORS = ["GDP_current_US", "GDP_per_capita_current_US", "Political_Stability", "Population"]
+# Skewed, positive columns that "pearson_log" correlates on a log scale
+LOG_COLUMNS = {"outgoing_routes", "unique_airlines", "reachable_countries", "hub_centrality",
+               "GDP_current_US", "GDP_per_capita_current_US", "Population"}
+METHODS = ["pearson", "pearson_log", "spearman"]
+# Pairs with fewer countries get no coefficient
+MIN_PAIR_SIZE = 3
+
+
+def country_metrics(graph):
+    """
+    Network metrics of every country with at least one outgoing route, from
+    whole-array operations over the route edges.
+
+    Args:
+        graph (RouteGraph): Route network.
+
+    Returns:
+        pd.DataFrame: Indexed by country, with the columns of METRICS:
+        outgoing routes, distinct airlines flying from or to the country,
+        destination countries reachable with a direct route, share of domestic
+        outgoing routes and the summed PageRank of the country's airports.
+    """
+    num_countries = len(graph.country_names)
+    sources = graph.country_codes[graph.edge_sources()]
+    destinations = graph.country_codes[graph.indices]
+    known = (sources >= 0) & (destinations >= 0)
+    sources, destinations, airlines = sources[known], destinations[known], graph.edge_airline_ids[known]
+
+    outgoing = np.bincount(sources, minlength=num_countries)
+    domestic = np.bincount(sources[sources == destinations], minlength=num_countries)
+    country_pairs = np.unique(sources.astype(np.int64) * num_countries + destinations)
+    reachable = np.bincount(country_pairs // num_countries, minlength=num_countries)
+    touching = np.unique(np.concatenate([
+        np.stack([sources, airlines], axis=1),
+        np.stack([destinations, airlines], axis=1),
+    ]), axis=0)
+    unique_airlines = np.bincount(touching[:, 0], minlength=num_countries)
+    airport_countries = graph.country_codes >= 0
+    centrality = np.bincount(graph.country_codes[airport_countries], weights=pagerank(graph)[airport_countries],
+                             minlength=num_countries)
+
+    metrics = pd.DataFrame({
+        "outgoing_routes": outgoing,
+        "unique_airlines": unique_airlines,
+        "reachable_countries": reachable,
+        "domestic_share": domestic / np.maximum(outgoing, 1),
+        "hub_centrality": centrality,
+    }, index=pd.Index(graph.country_names, name="Country"))
+    return metrics[outgoing > 0]
+
+
+def load_country_table(clean_data_dir=CLEAN_DATA_DIR):
+    """
+    The network metrics and economic indicators of every country with routes.
+    Indicators are missing for countries without GDP data.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+
+    Returns:
+        pd.DataFrame: Indexed by country, with the columns of METRICS and INDICATORS.
+    """
+    file_name, columns = TABLES["countries"]
+    countries = pd.read_csv(os.path.join(clean_data_dir, file_name), header=0, names=columns)
+    indicators = countries.set_index("Country_Name")[INDICATORS].apply(pd.to_numeric, errors="coerce")
+    metrics = country_metrics(load_route_graph(clean_data_dir))
+    return metrics.join(indicators[~indicators.index.duplicated()])
+
+
+def _transform(table, columns, method):
+    """Column values as an (n_columns, n_countries) float array, logged for pearson_log."""
+    values = table[columns].to_numpy(dtype=float).T
+    if method == "pearson_log":
+        values = values.copy()
+        for i, column in enumerate(columns):
+            if column in LOG_COLUMNS:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values[i] = np.where(values[i] > 0, np.log10(values[i]), np.nan)
+    return values
+
+
+def _average_ranks(codes, num_codes, weights):
+    """
+    Ranks of every country within weighted samples, ties sharing their average
+    rank, as in scipy.stats.rankdata.
+
+    Args:
+        codes (np.ndarray): (n,) position of each country's value among the
+            distinct values of the column, in ascending order.
+        num_codes (int): Number of distinct values.
+        weights (np.ndarray): (..., n) how often each country is in each sample
+            (0 if it is left out).
+
+    Returns:
+        np.ndarray: (..., n) rank of each country's value in each sample.
+    """
+    one_hot = np.zeros((len(codes), num_codes))
+    one_hot[np.arange(len(codes)), codes] = 1.0
+    counts = weights @ one_hot
+    below = np.cumsum(counts, axis=-1) - counts
+    return (below + (counts + 1) / 2)[..., codes]
+
+
+def _rank_codes(values):
+    """Distinct-value codes of every row, for _average_ranks (0 for missing values, which get no weight)."""
+    codes = np.zeros(values.shape, dtype=np.int64)
+    num_codes = np.ones(len(values), dtype=np.int64)
+    for i, row in enumerate(values):
+        present = ~np.isnan(row)
+        distinct, codes[i, present] = np.unique(row[present], return_inverse=True)
+        num_codes[i] = max(len(distinct), 1)
+    return codes, num_codes
+
+
+def _correlations(x, y, sample_counts, method):
+    """
+    Correlation of every metric with every indicator in a batch of samples, all
+    pairs at once. A sample is given by how often each country is in it; a
+    country is left out of a pair if either of its two values is missing.
+
+    Args:
+        x (np.ndarray): (m, n) metric values.
+        y (np.ndarray): (k, n) indicator values.
+        sample_counts (np.ndarray): (b, n) occurrences of each country per sample.
+        method (str): One of METHODS.
+
+    Returns:
+        tuple: (b, m, k) coefficients (NaN for pairs with fewer than
+        MIN_PAIR_SIZE countries or without variance) and (b, m, k) pair sizes.
+    """
+    x_present, y_present = ~np.isnan(x), ~np.isnan(y)
+    weights = (sample_counts[:, None, None, :] * x_present[None, :, None, :] * y_present[None, None, :, :])
+    x_values = np.where(x_present, x, 0.0)[None, :, None, :]
+    y_values = np.where(y_present, y, 0.0)[None, None, :, :]
+
+    if method == "spearman":
+        # Ranks depend on which countries are in the pair's sample, so they are
+        # taken per column, for all samples and partner columns at once
+        x_codes, x_num_codes = _rank_codes(x)
+        y_codes, y_num_codes = _rank_codes(y)
+        x_values = np.stack([_average_ranks(x_codes[i], x_num_codes[i], weights[:, i])
+                             for i in range(len(x))], axis=1)
+        y_values = np.stack([_average_ranks(y_codes[j], y_num_codes[j], weights[:, :, j])
+                             for j in range(len(y))], axis=2)
+
+    sizes = weights.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_centered = x_values - (weights * x_values).sum(axis=-1, keepdims=True) / sizes[..., None]
+        y_centered = y_values - (weights * y_values).sum(axis=-1, keepdims=True) / sizes[..., None]
+        covariance = (weights * x_centered * y_centered).sum(axis=-1)
+        x_variance = (weights * x_centered ** 2).sum(axis=-1)
+        y_variance = (weights * y_centered ** 2).sum(axis=-1)
+        coefficients = covariance / np.sqrt(x_variance * y_variance)
+    coefficients[(sizes < MIN_PAIR_SIZE) | ~np.isfinite(coefficients)] = np.nan
+    return np.clip(coefficients, -1.0, 1.0), sizes
+
+
+def correlation_matrix(table, method="pearson", metrics=METRICS, indicators=INDICATORS):
+    """
+    Correlation of every metric with every indicator, each pair over the
+    countries that have both values.
+
+    Args:
+        table (pd.DataFrame): Country table from load_country_table.
+        method (str): 'pearson', 'pearson_log' (Pearson after taking log10 of
+            the LOG_COLUMNS) or 'spearman'.
+        metrics (list): Metric columns.
+        indicators (list): Indicator columns.
+
+    Returns:
+        pd.DataFrame: Metrics as rows, indicators as columns.
+    """
+    x, y = _transform(table, metrics, method), _transform(table, indicators, method)
+    coefficients, _ = _correlations(x, y, np.ones((1, len(table))), method)
+    return pd.DataFrame(coefficients[0], index=metrics, columns=indicators)
+
+
+def _bootstrap_batch(task):
+    """
+    Coefficients of one batch of bootstrap resamples. Each resample draws the
+    countries with replacement, expressed as multinomial occurrence counts.
+
+    Args:
+        task (tuple): (metric values, indicator values, method, number of resamples, seed)
+
+    Returns:
+        np.ndarray: (resamples, m, k) coefficients.
+    """
+    x, y, method, num_resamples, seed = task
+    n = x.shape[1]
+    sample_counts = np.random.default_rng(seed).multinomial(n, np.full(n, 1.0 / n), size=num_resamples)
+    return _correlations(x, y, sample_counts.astype(float), method)[0]
+
+
+def bootstrap_correlations(table, method="pearson", num_resamples=10_000, metrics=METRICS,
+                           indicators=INDICATORS, num_workers=None, batch_size=100, seed=0):
+    """
+    Bootstrap distribution of every metric x indicator coefficient. The
+    resamples are computed in batches of whole-array operations, and the
+    batches are spread over a process pool.
+
+    Args:
+        table (pd.DataFrame): Country table from load_country_table.
+        method (str): One of METHODS.
+        num_resamples (int): Number of bootstrap resamples.
+        metrics (list): Metric columns.
+        indicators (list): Indicator columns.
+        num_workers (int): Number of worker processes. Defaults to the number of CPUs.
+        batch_size (int): Resamples per task; memory per task grows with
+            batch_size x pairs x countries.
+        seed (int): Seed of the resamples. The result does not depend on num_workers.
+
+    Returns:
+        np.ndarray: (num_resamples, m, k) coefficients.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    x, y = _transform(table, metrics, method), _transform(table, indicators, method)
+    sizes = [min(batch_size, num_resamples - start) for start in range(0, num_resamples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(x, y, method, size, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+    if num_workers == 1:
+        batches = [_bootstrap_batch(task) for task in tasks]
+    else:
+        with Pool(num_workers) as pool:
+            batches = pool.map(_bootstrap_batch, tasks)
+    return np.concatenate(batches)
+
+
+def correlation_table(table, methods=METHODS, num_resamples=10_000, confidence=0.95, metrics=METRICS,
+                      indicators=INDICATORS, num_workers=None, seed=0):
+    """
+    Coefficients with percentile bootstrap confidence intervals for every metric,
+    indicator and method.
+
+    Args:
+        table (pd.DataFrame): Country table from load_country_table.
+        methods (list): Methods from METHODS.
+        num_resamples (int): Bootstrap resamples per method.
+        confidence (float): Confidence level of the intervals.
+        metrics (list): Metric columns.
+        indicators (list): Indicator columns.
+        num_workers (int): Number of worker processes.
+        seed (int): Seed of the resamples.
+
+    Returns:
+        pd.DataFrame: One row per metric, indicator and method with the number of
+        countries, the coefficient and the bounds of its confidence interval.
+    """
+    tail = (1 - confidence) / 2 * 100
+    parts = []
+    for method in methods:
+        x, y = _transform(table, metrics, method), _transform(table, indicators, method)
+        coefficients, sizes = _correlations(x, y, np.ones((1, len(table))), method)
+        resamples = bootstrap_correlations(table, method, num_resamples, metrics, indicators, num_workers, seed=seed)
+        with np.errstate(invalid="ignore"):
+            low, high = np.nanpercentile(resamples, [tail, 100 - tail], axis=0)
+        parts.append(pd.DataFrame({
+            "metric": np.repeat(metrics, len(indicators)),
+            "indicator": np.tile(indicators, len(metrics)),
+            "method": method,
+            "countries": sizes[0].ravel().astype(int),
+            "r": coefficients[0].ravel(),
+            "ci_low": low.ravel(),
+            "ci_high": high.ravel(),
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlate the network metrics of countries with their economy.")
+    parser.add_argument("--data-dir", default=CLEAN_DATA_DIR, help="directory with the clean CSV files")
+    parser.add_argument("--resamples", type=int, default=10_000, help="bootstrap resamples per method")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the resamples")
+    args = parser.parse_args()
+
+    country_table = load_country_table(args.data_dir)
+    start = time.perf_counter()
+    result = correlation_table(country_table, num_resamples=args.resamples, confidence=args.confidence,
+                               num_workers=args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(result.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+    print(f"{len(result)} coefficients with {args.resamples} resamples each in {elapsed:.2f}s")
@@ -0,0 +1,392 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLEAN_DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "clean_data"))
+
+
+class RouteGraph:
+    """
+    Directed route network in compressed sparse row (CSR) form.
+
+    Airports are numbered 0..num_airports-1 in Airport_ID order. The outgoing
+    routes of airport i are the edges indptr[i]:indptr[i+1]; indices holds their
+    destination airports, edge_airline_ids and edge_stops their attributes.
+    Every route is one edge, so airport pairs served by several airlines have
+    parallel edges.
+    """
+
+    def __init__(self, airport_ids, airport_names, country_codes, country_names,
+                 indptr, indices, edge_airline_ids, edge_stops):
+        self.airport_ids = airport_ids
+        self.airport_names = airport_names
+        self.country_codes = country_codes
+        self.country_names = country_names
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_airline_ids = edge_airline_ids
+        self.edge_stops = edge_stops
+
+    @property
+    def num_airports(self):
+        return len(self.airport_ids)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def edge_sources(self):
+        """Source airport of every edge, the row counterpart of indices."""
+        return np.repeat(np.arange(self.num_airports, dtype=np.int32), self.out_degrees())
+
+    def airport_index(self, airport_ids):
+        """
+        Dense indices of airports.
+
+        Args:
+            airport_ids: Airport_ID or array of Airport_IDs.
+
+        Returns:
+            np.ndarray: Dense indices.
+
+        Raises:
+            KeyError: If an Airport_ID is not in the graph.
+        """
+        airport_ids = np.atleast_1d(np.asarray(airport_ids))
+        idx = np.searchsorted(self.airport_ids, airport_ids)
+        idx = np.minimum(idx, self.num_airports - 1)
+        if not np.array_equal(self.airport_ids[idx], airport_ids):
+            raise KeyError(f"Unknown Airport_ID in {airport_ids.tolist()}")
+        return idx.astype(np.int32)
+
+    def country_airports(self, country):
+        """Dense indices of the airports of a country."""
+        matches = np.flatnonzero(self.country_names == country)
+        if len(matches) == 0:
+            raise KeyError(f"Unknown country {country!r}")
+        return np.flatnonzero(self.country_codes == matches[0]).astype(np.int32)
+
+    def simple(self):
+        """The graph with parallel edges merged, for measures that count paths."""
+        pairs = np.unique(self.edge_sources().astype(np.int64) * self.num_airports + self.indices)
+        sources, indices = np.divmod(pairs, self.num_airports)
+        indptr = np.zeros(self.num_airports + 1, dtype=np.int32)
+        np.cumsum(np.bincount(sources, minlength=self.num_airports), out=indptr[1:])
+        return RouteGraph(self.airport_ids, self.airport_names, self.country_codes, self.country_names,
+                          indptr, indices.astype(np.int32), None, None)
+
+
+def build_route_graph(routes_df, airports_df):
+    """
+    Builds the CSR graph from the routes and airports tables.
+
+    Args:
+        routes_df (pd.DataFrame): Routes with Source airport ID, Destination airport ID,
+            Airline ID and Stops columns (CSV or database names).
+        airports_df (pd.DataFrame): Airports with Airport ID, Name and Country columns.
+
+    Returns:
+        RouteGraph: The route network. Routes to airports that are not in
+        airports_df are left out.
+    """
+    routes_df = routes_df.rename(columns=lambda column: column.replace(" ", "_"))
+    airports_df = airports_df.rename(columns=lambda column: column.replace(" ", "_"))
+    airports_df = airports_df.sort_values("Airport_ID")
+    airport_ids = airports_df["Airport_ID"].to_numpy(dtype=np.int32)
+    countries = pd.Categorical(airports_df["Country"])
+
+    source_ids = routes_df["Source_airport_ID"].to_numpy(dtype=np.int64)
+    destination_ids = routes_df["Destination_airport_ID"].to_numpy(dtype=np.int64)
+    sources = np.minimum(np.searchsorted(airport_ids, source_ids), len(airport_ids) - 1)
+    destinations = np.minimum(np.searchsorted(airport_ids, destination_ids), len(airport_ids) - 1)
+    known = (airport_ids[sources] == source_ids) & (airport_ids[destinations] == destination_ids)
+
+    # A stable sort keeps the routes of an airport in file order
+    order = np.flatnonzero(known)[np.argsort(sources[known], kind="stable")]
+    indptr = np.zeros(len(airport_ids) + 1, dtype=np.int32)
+    np.cumsum(np.bincount(sources[known], minlength=len(airport_ids)), out=indptr[1:])
+
+    return RouteGraph(
+        airport_ids=airport_ids,
+        airport_names=airports_df["Name"].to_numpy(dtype=object),
+        country_codes=countries.codes.astype(np.int32),
+        country_names=np.asarray(countries.categories, dtype=object),
+        indptr=indptr,
+        indices=destinations[order].astype(np.int32),
+        edge_airline_ids=routes_df["Airline_ID"].to_numpy(dtype=np.int32)[order],
+        edge_stops=routes_df["Stops"].to_numpy(dtype=np.int8)[order],
+    )
+
+
+def load_route_graph(clean_data_dir=CLEAN_DATA_DIR):
+    """
+    Loads the route graph from clean_data/routes.csv and airports.csv.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+
+    Returns:
+        RouteGraph: The route network.
+    """
+    routes_df = pd.read_csv(os.path.join(clean_data_dir, "routes.csv"),
+                            usecols=["Airline ID", "Source airport ID", "Destination airport ID", "Stops"])
+    airports_df = pd.read_csv(os.path.join(clean_data_dir, "airports.csv"),
+                              usecols=["Airport ID", "Name", "Country"])
+    return build_route_graph(routes_df, airports_df)
+
+
+def _frontier_edges(graph, frontier):
+    """Positions of all outgoing edges of the frontier airports, and the source of each."""
+    starts = graph.indptr[frontier]
+    counts = graph.indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    # For every edge: start of its airport's row plus its position within the row
+    row_offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return row_offsets + np.arange(total), np.repeat(frontier, counts)
+
+
+def bfs_legs(graph, sources, max_legs=None):
+    """
+    Minimum number of legs from any of the sources to every airport, expanding
+    one whole BFS level at a time.
+
+    Args:
+        graph (RouteGraph): Route network.
+        sources (array): Dense indices of the start airports.
+        max_legs (int): Stop after this many legs. None for no limit.
+
+    Returns:
+        np.ndarray: int16 legs per airport, -1 for airports that are not reached.
+    """
+    legs = np.full(graph.num_airports, -1, dtype=np.int16)
+    frontier = np.unique(np.asarray(sources, dtype=np.int32))
+    legs[frontier] = 0
+    level = 0
+    while frontier.size and (max_legs is None or level < max_legs):
+        level += 1
+        edges, _ = _frontier_edges(graph, frontier)
+        targets = np.unique(graph.indices[edges])
+        frontier = targets[legs[targets] < 0]
+        legs[frontier] = level
+    return legs
+
+
+def reachable_airports(graph, airport_id, max_legs=2):
+    """
+    Airports reachable from an airport within max_legs legs.
+
+    Args:
+        graph (RouteGraph): Route network.
+        airport_id (int): Airport_ID of the start airport.
+        max_legs (int): Maximum number of legs.
+
+    Returns:
+        pd.DataFrame: Airport_ID, Name, Country and legs of every reachable airport.
+    """
+    legs = bfs_legs(graph, graph.airport_index(airport_id), max_legs)
+    reached = np.flatnonzero(legs > 0)
+    return pd.DataFrame({
+        "Airport_ID": graph.airport_ids[reached],
+        "Name": graph.airport_names[reached],
+        "Country": graph.country_names[graph.country_codes[reached]],
+        "legs": legs[reached],
+    }).sort_values(["legs", "Airport_ID"], ignore_index=True)
+
+
+def reachable_countries(graph, origin, max_legs=1):
+    """
+    Countries reachable from any airport of a country within max_legs legs.
+    With max_legs=1 these are the direct destinations of Question 7.
+
+    Args:
+        graph (RouteGraph): Route network.
+        origin (str): Origin country.
+        max_legs (int): Maximum number of legs.
+
+    Returns:
+        pd.DataFrame: Every reachable country other than the origin with the
+        minimum number of legs to get there.
+    """
+    legs = bfs_legs(graph, graph.country_airports(origin), max_legs)
+    reached = np.flatnonzero((legs > 0) & (graph.country_codes >= 0))
+    min_legs = np.full(len(graph.country_names), np.iinfo(np.int16).max, dtype=np.int16)
+    np.minimum.at(min_legs, graph.country_codes[reached], legs[reached])
+    countries = np.flatnonzero((min_legs < np.iinfo(np.int16).max) & (graph.country_names != origin))
+    return pd.DataFrame({"country": graph.country_names[countries], "legs": min_legs[countries]}) \
+        .sort_values(["legs", "country"], ignore_index=True)
+
+
+def connected_components(graph):
+    """
+    Weakly connected components, by propagating the smallest airport index over
+    the edges in both directions until no label changes.
+
+    Args:
+        graph (RouteGraph): Route network.
+
+    Returns:
+        np.ndarray: int32 component label per airport (the smallest index in the component).
+    """
+    sources, destinations = graph.edge_sources(), graph.indices
+    labels = np.arange(graph.num_airports, dtype=np.int32)
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, destinations, labels[sources])
+        np.minimum.at(new_labels, sources, labels[destinations])
+        # Pointer jumping: take over the label of the label, which halves the remaining distance
+        new_labels = new_labels[new_labels]
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def pagerank(graph, damping=0.85, tol=1e-10, max_iter=200):
+    """
+    PageRank by power iteration. Parallel edges count as separate links, so a
+    pair of airports served by more routes passes on more rank.
+
+    Args:
+        graph (RouteGraph): Route network.
+        damping (float): Damping factor.
+        tol (float): Stop when the L1 change of the ranks falls below this.
+        max_iter (int): Maximum number of iterations.
+
+    Returns:
+        np.ndarray: Rank per airport, summing to 1.
+    """
+    n = graph.num_airports
+    sources = graph.edge_sources()
+    out_degrees = graph.out_degrees()
+    dangling = out_degrees == 0
+    ranks = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        contributions = ranks[sources] / out_degrees[sources]
+        new_ranks = np.bincount(graph.indices, weights=contributions, minlength=n)
+        new_ranks = (1 - damping) / n + damping * (new_ranks + ranks[dangling].sum() / n)
+        if np.abs(new_ranks - ranks).sum() < tol:
+            return new_ranks
+        ranks = new_ranks
+    return ranks
+
+
+def betweenness_centrality(graph, num_sources=None, seed=0, normalized=True):
+    """
+    Betweenness centrality with Brandes' algorithm on the graph without parallel
+    edges. Shortest paths are counted per BFS level with whole-level array
+    operations instead of node by node.
+
+    Args:
+        graph (RouteGraph): Route network.
+        num_sources (int): Estimate from this many random start airports instead
+            of all of them.
+        seed (int): Seed for the sampled start airports.
+        normalized (bool): Divide by (n-1)(n-2) for the n airports that have routes.
+
+    Returns:
+        np.ndarray: Betweenness per airport.
+    """
+    simple = graph.simple()
+    n = simple.num_airports
+    sources = np.flatnonzero(simple.out_degrees() > 0)
+    scale = 1.0
+    if num_sources is not None and num_sources < len(sources):
+        scale = len(sources) / num_sources
+        sources = np.random.default_rng(seed).choice(sources, num_sources, replace=False)
+
+    betweenness = np.zeros(n)
+    for source in sources:
+        distance = np.full(n, -1, dtype=np.int32)
+        sigma = np.zeros(n)
+        distance[source] = 0
+        sigma[source] = 1.0
+        frontier = np.array([source], dtype=np.int32)
+        level_edges = []
+        level = 0
+        while frontier.size:
+            edges, edge_sources = _frontier_edges(simple, frontier)
+            targets = simple.indices[edges]
+            new_nodes = np.unique(targets[distance[targets] < 0])
+            distance[new_nodes] = level + 1
+            on_path = distance[targets] == level + 1
+            tails, heads = edge_sources[on_path], targets[on_path]
+            sigma += np.bincount(heads, weights=sigma[tails], minlength=n)
+            level_edges.append((tails, heads))
+            frontier = new_nodes
+            level += 1
+
+        delta = np.zeros(n)
+        for tails, heads in reversed(level_edges):
+            delta += np.bincount(tails, weights=sigma[tails] / sigma[heads] * (1 + delta[heads]), minlength=n)
+        delta[source] = 0
+        betweenness += delta
+
+    betweenness *= scale
+    if normalized:
+        active = int(np.count_nonzero((simple.out_degrees() > 0) | (np.bincount(simple.indices, minlength=n) > 0)))
+        if active > 2:
+            betweenness /= (active - 1) * (active - 2)
+    return betweenness
+
+
+def hub_ranking(graph, measure="pagerank", top=10, **kwargs):
+    """
+    Airports with the highest PageRank or betweenness.
+
+    Args:
+        graph (RouteGraph): Route network.
+        measure (str): 'pagerank' or 'betweenness'.
+        top (int): Number of airports to return.
+        **kwargs: Passed to the measure.
+
+    Returns:
+        pd.DataFrame: Airport_ID, Name, Country and score, best first.
+    """
+    if measure == "pagerank":
+        scores = pagerank(graph, **kwargs)
+    elif measure == "betweenness":
+        scores = betweenness_centrality(graph, **kwargs)
+    else:
+        raise ValueError(f"Unknown measure {measure!r}")
+    best = np.argsort(-scores, kind="stable")[:top]
+    return pd.DataFrame({
+        "Airport_ID": graph.airport_ids[best],
+        "Name": graph.airport_names[best],
+        "Country": graph.country_names[graph.country_codes[best]],
+        "score": scores[best],
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the route network graph.")
+    parser.add_argument("--data-dir", default=CLEAN_DATA_DIR, help="directory with the clean CSV files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    airports_parser = subparsers.add_parser("airports", help="airports reachable from an airport")
+    airports_parser.add_argument("airport_id", type=int)
+    airports_parser.add_argument("--legs", type=int, default=2)
+    countries_parser = subparsers.add_parser("countries", help="countries reachable from a country")
+    countries_parser.add_argument("country")
+    countries_parser.add_argument("--legs", type=int, default=1)
+    hubs_parser = subparsers.add_parser("hubs", help="most central airports")
+    hubs_parser.add_argument("--measure", choices=["pagerank", "betweenness"], default="pagerank")
+    hubs_parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    route_graph = load_route_graph(args.data_dir)
+    start = time.perf_counter()
+    if args.command == "airports":
+        result = reachable_airports(route_graph, args.airport_id, args.legs)
+    elif args.command == "countries":
+        result = reachable_countries(route_graph, args.country, args.legs)
+    else:
+        result = hub_ranking(route_graph, args.measure, args.top)
+    print(result.to_string(index=False))
+    print(f"{len(result)} rows in {(time.perf_counter() - start) * 1000:.1f} ms")
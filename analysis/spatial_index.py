@@ -0,0 +1,170 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CLEAN_DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "clean_data"))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "data_cleaning"))
+
+from route_distances import EARTH_RADIUS_KM, haversine_km  # noqa: E402
+
+
+def _unit_vectors(latitudes, longitudes):
+    lat, lon = np.radians(np.asarray(latitudes, dtype=np.float64)), np.radians(np.asarray(longitudes, dtype=np.float64))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+def _chord_length(distance_km):
+    """Straight-line distance through the unit sphere for a great-circle distance."""
+    return 2 * np.sin(np.minimum(distance_km / EARTH_RADIUS_KM, np.pi) / 2)
+
+
+class AirportGrid:
+    """
+    Uniform grid over the airports' positions as 3D unit vectors. Working in 3D
+    avoids the special cases of a latitude/longitude grid at the poles and the
+    antimeridian: the great-circle distance only grows with the straight-line
+    distance, so a radius query only has to look at the grid cells within the
+    matching straight-line distance and compute exact distances for the
+    airports in them.
+    """
+
+    def __init__(self, airport_ids, latitudes, longitudes, cell_km=50.0):
+        vectors = _unit_vectors(latitudes, longitudes)
+        self.cell_km = cell_km
+        self.cell_size = _chord_length(cell_km)
+        self.cells_per_axis = int(np.ceil(2 / self.cell_size)) + 1
+        cell_keys = self._cell_keys(np.floor((vectors + 1) / self.cell_size).astype(np.int64))
+
+        order = np.argsort(cell_keys, kind="stable")
+        self.airport_ids = np.asarray(airport_ids)[order]
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)[order]
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)[order]
+        self.vectors = vectors[order]
+        self.cell_keys, self.cell_starts = np.unique(cell_keys[order], return_index=True)
+        self.cell_ends = np.append(self.cell_starts[1:], len(order))
+
+    def _cell_keys(self, cells):
+        return (cells[..., 0] * self.cells_per_axis + cells[..., 1]) * self.cells_per_axis + cells[..., 2]
+
+    def _candidates(self, vector, chord):
+        """Positions of the airports in all cells that may hold points within chord of vector."""
+        low = np.floor((vector - chord + 1) / self.cell_size).astype(np.int64)
+        high = np.floor((vector + chord + 1) / self.cell_size).astype(np.int64)
+        axes = [np.arange(max(lo, 0), min(hi, self.cells_per_axis - 1) + 1) for lo, hi in zip(low, high)]
+        if np.prod([len(axis) for axis in axes]) > len(self.cell_keys):
+            # Large radius: checking every airport is cheaper than enumerating the cells
+            return np.arange(len(self.airport_ids))
+        keys = self._cell_keys(np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3))
+        found = np.minimum(np.searchsorted(self.cell_keys, keys), len(self.cell_keys) - 1)
+        found = found[self.cell_keys[found] == keys]
+        if len(found) == 0:
+            return np.empty(0, dtype=np.int64)
+        counts = self.cell_ends[found] - self.cell_starts[found]
+        return np.repeat(self.cell_starts[found] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+
+    def within_radius(self, latitude, longitude, radius_km):
+        """
+        Airports within radius_km of a point.
+
+        Args:
+            latitude (float): Latitude of the point in degrees.
+            longitude (float): Longitude of the point in degrees.
+            radius_km (float): Search radius in km.
+
+        Returns:
+            pd.DataFrame: Airport_ID and distance_km, nearest first.
+        """
+        vector = _unit_vectors([latitude], [longitude])[0]
+        candidates = self._candidates(vector, _chord_length(radius_km))
+        distances = haversine_km(latitude, longitude, self.latitudes[candidates], self.longitudes[candidates])
+        inside = distances <= radius_km
+        result = pd.DataFrame({"Airport_ID": self.airport_ids[candidates][inside], "distance_km": distances[inside]})
+        return result.sort_values(["distance_km", "Airport_ID"], ignore_index=True)
+
+    def nearest(self, latitude, longitude, k=1):
+        """
+        The k airports nearest to a point, found by radius queries with a
+        doubling radius.
+
+        Args:
+            latitude (float): Latitude of the point in degrees.
+            longitude (float): Longitude of the point in degrees.
+            k (int): Number of airports.
+
+        Returns:
+            pd.DataFrame: Airport_ID and distance_km, nearest first.
+        """
+        radius_km = self.cell_km
+        while True:
+            result = self.within_radius(latitude, longitude, radius_km)
+            if len(result) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                return result.head(k)
+            radius_km = min(radius_km * 2, np.pi * EARTH_RADIUS_KM)
+
+
+def load_airport_grid(clean_data_dir=CLEAN_DATA_DIR, cell_km=50.0):
+    """
+    Builds the spatial index over clean_data/airports.csv.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+        cell_km (float): Grid cell size in km.
+
+    Returns:
+        AirportGrid: The index.
+    """
+    airports_df = pd.read_csv(os.path.join(clean_data_dir, "airports.csv"),
+                              usecols=["Airport ID", "Latitude", "Longitude"]).dropna()
+    return AirportGrid(airports_df["Airport ID"], airports_df["Latitude"], airports_df["Longitude"], cell_km)
+
+
+def country_distance_stats(clean_data_dir=CLEAN_DATA_DIR):
+    """
+    Distance-weighted route statistics per country of the source airport, from
+    the Distance km column of clean_data/routes.csv.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+
+    Returns:
+        pd.DataFrame: Country, outgoing_routes, total_route_km, mean_route_km,
+        median_route_km and domestic_route_km.
+    """
+    routes_df = pd.read_csv(os.path.join(clean_data_dir, "routes.csv"),
+                            usecols=["Source airport ID", "Destination airport ID", "Distance km"])
+    airports_df = pd.read_csv(os.path.join(clean_data_dir, "airports.csv"), usecols=["Airport ID", "Country"])
+    country = airports_df.set_index("Airport ID")["Country"]
+    routes_df["Country"] = routes_df["Source airport ID"].map(country)
+    domestic = routes_df["Country"] == routes_df["Destination airport ID"].map(country)
+    routes_df["domestic_km"] = routes_df["Distance km"].where(domestic, 0.0)
+    stats = routes_df.groupby("Country").agg(
+        outgoing_routes=("Distance km", "size"),
+        total_route_km=("Distance km", "sum"),
+        mean_route_km=("Distance km", "mean"),
+        median_route_km=("Distance km", "median"),
+        domestic_route_km=("domestic_km", "sum"),
+    )
+    return stats.reset_index().sort_values("total_route_km", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nearest-airport and within-radius lookups.")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("--radius", type=float, default=None, help="list all airports within this many km")
+    parser.add_argument("-k", type=int, default=5, help="number of nearest airports")
+    args = parser.parse_args()
+
+    grid = load_airport_grid()
+    start = time.perf_counter()
+    if args.radius is not None:
+        found = grid.within_radius(args.latitude, args.longitude, args.radius)
+    else:
+        found = grid.nearest(args.latitude, args.longitude, args.k)
+    print(found.to_string(index=False))
+    print(f"{len(found)} airports in {(time.perf_counter() - start) * 1000:.2f} ms")
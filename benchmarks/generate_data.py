@@ -0,0 +1,150 @@
+import argparse
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+DATA_DIR = os.path.join(SCRIPT_DIR, "data")
+
+SCALES = [10, 100, 1000]
+
+# Airports and airlines grow with scale ** ENTITY_EXPONENT and routes with scale,
+# so the network gets both larger and denser as it would with more real data
+ENTITY_EXPONENT = 0.5
+
+# Files the build reads besides the three generated ones; copied unchanged
+COPIED_FILES = [
+    "source_data/country_gdp.csv",
+    "source_data/airplanes.csv",
+    "clean_data/airplanes.csv",
+    "clean_data_mappings/mapped_gdp_countries.csv",
+]
+
+# Values that are not codes of a real airport or airline and are kept as they are
+NOT_CODES = {"", "\\N", "-"}
+
+
+def _id_stride(ids):
+    """Offset between the IDs of two replicas: the next power of ten above every ID."""
+    numeric = pd.to_numeric(ids, errors="coerce")
+    return 10 ** len(str(int(numeric.abs().max())))
+
+
+def _replicate_ids(ids, replicas, stride):
+    """Shifts numeric IDs by replica * stride; '\\N' and other non-numbers are kept."""
+    numeric = pd.to_numeric(ids, errors="coerce")
+    shifted = (numeric + replicas * stride).astype("Int64").astype(str)
+    return ids.where(numeric.isna(), shifted)
+
+
+def _replicate_codes(codes, replicas):
+    """
+    Gives the codes of replica r > 0 a fixed-width suffix (ATL -> ATL001), which
+    keeps them unique within their column since every real code has the same
+    length as the others of its kind.
+    """
+    suffixes = pd.Series(replicas, index=codes.index).astype(str).str.zfill(3)
+    return codes.mask((replicas > 0) & ~codes.isin(NOT_CODES), codes + suffixes)
+
+
+def replicate_entities(entities_df, id_column, code_columns, num_replicas):
+    """
+    Copies airports or airlines num_replicas times. Replica 0 is the original
+    data; later replicas get shifted IDs, suffixed codes and names.
+
+    Args:
+        entities_df (pd.DataFrame): Source airports or airlines, as text.
+        id_column (str): ID column.
+        code_columns (list): Code columns (IATA, ICAO).
+        num_replicas (int): Number of copies.
+
+    Returns:
+        tuple: (replicated DataFrame, ID stride)
+    """
+    stride = _id_stride(entities_df[id_column])
+    replicas = np.repeat(np.arange(num_replicas), len(entities_df))
+    replicated = pd.concat([entities_df] * num_replicas, ignore_index=True)
+    replicated[id_column] = _replicate_ids(replicated[id_column], replicas, stride)
+    for column in code_columns:
+        replicated[column] = _replicate_codes(replicated[column], replicas)
+    replicated["Name"] = replicated["Name"].mask(replicas > 0, replicated["Name"] + " #" + pd.Series(replicas).astype(str))
+    replicated["index"] = np.arange(len(replicated)).astype(str)
+    return replicated, stride
+
+
+def generate_dataset(scale, output_dir, seed=0, entity_exponent=ENTITY_EXPONENT, source_dir=REPO_DIR):
+    """
+    Writes a synthetic dataset with scale times the routes of source_data, laid
+    out like the repository (source_data/, clean_data/, clean_data_mappings/) so
+    that data_cleaning/build.py can run on it.
+
+    Every synthetic route is a copy of a source route, so Equipment strings,
+    Codeshare values, Stops, '\\N' nulls and routes to unknown airports or
+    airlines occur in the same proportions as in the sample. Each copy is moved
+    to random replicas of its airline and airports; every replica of an airport
+    therefore gets routes in proportion to the original airport, which keeps the
+    shape of the airline and airport degree distributions.
+
+    Args:
+        scale (int): Route multiplier.
+        output_dir (str): Directory for the dataset.
+        seed (int): Random seed.
+        entity_exponent (float): Airports and airlines are replicated
+            round(scale ** entity_exponent) times.
+        source_dir (str): Repository with the sample data.
+
+    Returns:
+        dict: Number of rows per generated file.
+    """
+    rng = np.random.default_rng(seed)
+    num_replicas = max(1, round(scale ** entity_exponent))
+    read_text = dict(dtype=str, keep_default_na=False)
+
+    for relative_path in COPIED_FILES:
+        os.makedirs(os.path.join(output_dir, os.path.dirname(relative_path)), exist_ok=True)
+        shutil.copyfile(os.path.join(source_dir, relative_path), os.path.join(output_dir, relative_path))
+
+    airports_df, airport_stride = replicate_entities(
+        pd.read_csv(os.path.join(source_dir, "source_data", "airports.csv"), **read_text),
+        "Airport ID", ["IATA", "ICAO"], num_replicas)
+    airports_df.to_csv(os.path.join(output_dir, "source_data", "airports.csv"), index=False)
+    airlines_df, airline_stride = replicate_entities(
+        pd.read_csv(os.path.join(source_dir, "source_data", "airlines.csv"), **read_text),
+        "Airline ID", ["IATA", "ICAO"], num_replicas)
+    airlines_df.to_csv(os.path.join(output_dir, "source_data", "airlines.csv"), index=False)
+
+    routes_df = pd.read_csv(os.path.join(source_dir, "source_data", "routes.csv"), **read_text)
+    routes_path = os.path.join(output_dir, "source_data", "routes.csv")
+    tmp_routes_path = routes_path + ".tmp"
+    # One block of len(routes_df) routes at a time, so memory does not grow with scale
+    for block in range(scale):
+        block_df = routes_df.copy()
+        airline_replicas = rng.integers(num_replicas, size=len(block_df))
+        block_df["Airline ID"] = _replicate_ids(block_df["Airline ID"], airline_replicas, airline_stride)
+        block_df["Airline"] = _replicate_codes(block_df["Airline"], airline_replicas)
+        for side in ("Source", "Destination"):
+            airport_replicas = rng.integers(num_replicas, size=len(block_df))
+            block_df[f"{side} airport ID"] = _replicate_ids(block_df[f"{side} airport ID"], airport_replicas, airport_stride)
+            block_df[f"{side} airport"] = _replicate_codes(block_df[f"{side} airport"], airport_replicas)
+        block_df["index"] = (np.arange(len(block_df)) + block * len(block_df)).astype(str)
+        block_df.to_csv(tmp_routes_path, mode="w" if block == 0 else "a", header=block == 0, index=False)
+    os.replace(tmp_routes_path, routes_path)
+
+    counts = {"airports": len(airports_df), "airlines": len(airlines_df), "routes": len(routes_df) * scale}
+    print(f"Scale {scale}: {counts['routes']} routes, {counts['airports']} airports, "
+          f"{counts['airlines']} airlines written to {output_dir}")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate scaled synthetic copies of source_data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES)
+    parser.add_argument("--output-dir", default=DATA_DIR, help="datasets are written to <output-dir>/scale_<N>")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for dataset_scale in args.scales:
+        generate_dataset(dataset_scale, os.path.join(args.output_dir, f"scale_{dataset_scale}"), args.seed)
@@ -0,0 +1,250 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from generate_data import DATA_DIR, REPO_DIR, generate_dataset
+
+sys.path[:0] = [os.path.join(REPO_DIR, directory) for directory in ("data_cleaning", "ingestion", "analysis")]
+
+from build import build, publish  # noqa: E402
+from embedded_engine import QUESTIONS, load_notebook_queries, load_tables  # noqa: E402
+from instrumentation import RunReport  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_SCALES = [1, 10, 100]
+REPEAT = 3
+REGRESSION_THRESHOLD = 1.2
+
+# Placeholder airlines that the hand-finished clean_data leaves out
+PLACEHOLDER_AIRLINE_IDS = {"-1", "1"}
+NULL_MARKERS = ["\\N", "..", "-"]
+
+
+def finish_for_ingestion(clean_data_dir):
+    """
+    Applies the steps that turned the build output into the committed clean_data
+    and that are not part of data_cleaning/build.py, so the generated data can be
+    loaded into the schema of clean_data/ingestion.sql: null markers become empty
+    values, the index and airline Country columns are dropped, placeholder
+    airlines and their routes are removed and airline codes used by more than one
+    airline are cleared.
+
+    Args:
+        clean_data_dir (str): The dataset's clean_data directory, changed in place.
+    """
+    def read(name):
+        return pd.read_csv(os.path.join(clean_data_dir, name), dtype=str, keep_default_na=False)
+
+    def write(df, name):
+        df.replace(NULL_MARKERS, "").drop(columns=["index"], errors="ignore").to_csv(
+            os.path.join(clean_data_dir, name), index=False)
+
+    airlines_df = read("airlines.csv")
+    airlines_df = airlines_df[~airlines_df["Airline ID"].isin(PLACEHOLDER_AIRLINE_IDS)].drop(columns=["Country"])
+    for column in ("IATA", "ICAO"):
+        codes = airlines_df[column]
+        airlines_df[column] = codes.mask(codes.duplicated(keep=False) & ~codes.isin(NULL_MARKERS + [""]), "")
+    write(airlines_df, "airlines.csv")
+
+    routes_df = read("routes.csv")
+    write(routes_df[~routes_df["Airline ID"].isin(PLACEHOLDER_AIRLINE_IDS)], "routes.csv")
+    write(read("airports.csv"), "airports.csv")
+    write(read("aligned_gdp.csv"), "aligned_gdp.csv")
+
+
+def _timed(function, *args, repeat=1, **kwargs):
+    """Runs function repeat times and returns (last result, fastest time in seconds)."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def _run_postgres_query(dsn, sql):
+    import psycopg
+
+    with psycopg.connect(dsn) as conn:
+        return len(conn.execute(sql).fetchall())
+
+
+def benchmark_scale(scale, data_dir=DATA_DIR, dsn=None, repeat=REPEAT):
+    """
+    Benchmarks one scale:
+    1. Generates the dataset unless it exists.
+    2. Times every build stage.
+    3. Bulk loads the result into PostgreSQL and times the notebook queries there (only with a DSN).
+    4. Times the notebook questions on the embedded pandas engine.
+
+    A failing phase is recorded and ends the scale, since the later phases depend on it.
+
+    Args:
+        scale (int): Route multiplier.
+        data_dir (str): Directory with the generated datasets.
+        dsn (str): PostgreSQL connection string. The benchmark replaces the
+            tables of this database, so never pass a database with real data.
+        repeat (int): Query runs per question; the fastest is recorded.
+
+    Returns:
+        dict: Timings of this scale, with "error" set if a phase failed.
+    """
+    dataset_dir = os.path.join(data_dir, f"scale_{scale}")
+    clean_data_dir = os.path.join(dataset_dir, "clean_data")
+    result = {"scale": scale}
+    phase = "generate"
+    try:
+        if not os.path.exists(os.path.join(dataset_dir, "source_data", "routes.csv")):
+            result["rows"], result["generate_seconds"] = _timed(generate_dataset, scale, dataset_dir)
+
+        phase = "build"
+        report = RunReport(f"benchmark_scale_{scale}")
+        cache_dir = os.path.join(dataset_dir, ".build_cache")
+        try:
+            artifacts = build(repo_dir=dataset_dir, cache_dir=cache_dir, force=True, report=report)
+        finally:
+            result["stages"] = {metrics.name: metrics.to_dict() for metrics in report.stages}
+        publish(artifacts, repo_dir=dataset_dir, cache_dir=cache_dir)
+        finish_for_ingestion(clean_data_dir)
+
+        if dsn:
+            from bulk_load import bulk_load
+
+            phase = "ingestion"
+            _, result["ingestion_seconds"] = _timed(bulk_load, dsn, clean_data_dir)
+            phase = "postgres_queries"
+            result["postgres_queries"] = {}
+            for name, sql in load_notebook_queries().items():
+                rows, seconds = _timed(_run_postgres_query, dsn, sql, repeat=repeat)
+                result["postgres_queries"][name] = {"seconds": seconds, "rows": rows}
+                print(f"[scale {scale}] {name} on PostgreSQL: {seconds:.3f}s")
+
+        phase = "pandas_queries"
+        tables, result["pandas_load_seconds"] = _timed(load_tables, clean_data_dir)
+        result["pandas_queries"] = {}
+        for name, question in QUESTIONS.items():
+            answer, seconds = _timed(question, tables, repeat=repeat)
+            result["pandas_queries"][name] = {"seconds": seconds, "rows": len(answer)}
+            print(f"[scale {scale}] {name} on pandas: {seconds:.3f}s")
+    except Exception as e:
+        traceback.print_exc()
+        result["error"] = f"{phase}: {type(e).__name__}: {e}"
+    return result
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, data_dir=DATA_DIR, dsn=None, repeat=REPEAT, results_dir=RESULTS_DIR):
+    """
+    Benchmarks every scale and writes the results, tagged with the git commit
+    and machine, to <results_dir>/<timestamp>_<commit>.json.
+
+    Returns:
+        tuple: (results dict, path of the results file)
+    """
+    results = {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "postgres": bool(dsn),
+        "scales": {str(scale): benchmark_scale(scale, data_dir, dsn, repeat) for scale in scales},
+    }
+    os.makedirs(results_dir, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    results_path = os.path.join(results_dir, f"{timestamp}_{results['commit'] or 'unknown'}.json")
+    with open(results_path, mode="w", encoding="utf-8") as outfile:
+        json.dump(results, outfile, indent=2)
+    return results, results_path
+
+
+def flatten_timings(results):
+    """Maps (scale, measurement) to seconds for every timing in a results file."""
+    timings = {}
+    for scale, scale_result in results["scales"].items():
+        for name, metrics in scale_result.get("stages", {}).items():
+            if metrics["status"] == "ok":
+                timings[(scale, f"stage {name}")] = metrics["wall_seconds"]
+        for key in ("generate_seconds", "ingestion_seconds", "pandas_load_seconds"):
+            if key in scale_result:
+                timings[(scale, key.replace("_seconds", ""))] = scale_result[key]
+        for engine in ("postgres", "pandas"):
+            for name, query in scale_result.get(f"{engine}_queries", {}).items():
+                timings[(scale, f"{engine} {name}")] = query["seconds"]
+    return timings
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compares two results files measurement by measurement.
+
+    Args:
+        baseline (dict): Earlier results.
+        current (dict): Later results.
+        threshold (float): Slowdown ratio above which a measurement counts as a regression.
+
+    Returns:
+        pd.DataFrame: scale, measurement, baseline and current seconds, ratio and
+        regression flag, slowest ratio first.
+    """
+    before, after = flatten_timings(baseline), flatten_timings(current)
+    rows = [
+        {"scale": int(scale), "measurement": name, "baseline_s": before[(scale, name)],
+         "current_s": after[(scale, name)]}
+        for scale, name in sorted(before.keys() & after.keys(), key=lambda key: (int(key[0]), key[1]))
+    ]
+    comparison = pd.DataFrame(rows, columns=["scale", "measurement", "baseline_s", "current_s"])
+    comparison["ratio"] = comparison["current_s"] / comparison["baseline_s"].clip(lower=1e-9)
+    # Sub-millisecond timings are too noisy to flag
+    comparison["regression"] = (comparison["ratio"] > threshold) & (comparison["current_s"] > 1e-3)
+    return comparison.sort_values("ratio", ascending=False, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on scaled synthetic data.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and store the results")
+    run_parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES)
+    run_parser.add_argument("--data-dir", default=DATA_DIR, help="directory with the generated datasets")
+    run_parser.add_argument("--dsn", default=None,
+                            help="PostgreSQL to benchmark ingestion and SQL queries on (its tables are replaced)")
+    run_parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per query, the fastest is kept")
+
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                                help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        benchmark_results, path = run_benchmarks(args.scales, args.data_dir, args.dsn, args.repeat)
+        print(f"Results written to {path}")
+        failed = {scale: r["error"] for scale, r in benchmark_results["scales"].items() if "error" in r}
+        for failed_scale, error in failed.items():
+            print(f"Scale {failed_scale} failed in {error}")
+        sys.exit(1 if failed else 0)
+    else:
+        with open(args.baseline, encoding="utf-8") as baseline_file, open(args.current, encoding="utf-8") as current_file:
+            comparison_df = compare_results(json.load(baseline_file), json.load(current_file), args.threshold)
+        print(comparison_df.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
+        sys.exit(1 if comparison_df["regression"].any() else 0)
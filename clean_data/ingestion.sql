@@ -66,6 +66,7 @@ CREATE TABLE routes (
     "Codeshare" BIT(1),
     "Stops" INT NOT NULL CHECK ("Stops" >= 0),
     "Equipment" VARCHAR(255),
+    "Distance_km" FLOAT CHECK ("Distance_km" >= 0), -- Great-circle distance between the airports
     FOREIGN KEY ("Airline_ID") REFERENCES airlines("Airline_ID"),
     FOREIGN KEY ("Source_airport_ID") REFERENCES airports("Airport_ID"),
     FOREIGN KEY ("Destination_airport_ID") REFERENCES airports("Airport_ID")
@@ -0,0 +1,256 @@
+-- Rollup tables for the per-airport and per-country route statistics used by the
+-- analysis questions (Q4, Q5, Q6, Q7, Q10). They are filled once from routes and then
+-- kept up to date by triggers whenever routes are inserted, updated or deleted.
+-- Runs after ingestion.sql (scripts in /docker-entrypoint-initdb.d/ run in alphabetical
+-- order) and is safe to re-run, e.g. after ingestion/bulk_load.py replaced the tables.
+
+-- Per-airport route counts (a route from an airport to itself counts once in total_routes)
+CREATE TABLE IF NOT EXISTS airport_stats (
+    "Airport_ID" INT PRIMARY KEY,
+    outgoing_routes INT NOT NULL DEFAULT 0,
+    incoming_routes INT NOT NULL DEFAULT 0,
+    total_routes INT NOT NULL DEFAULT 0,
+    unique_airlines INT NOT NULL DEFAULT 0
+);
+
+-- Number of routes per airport and airline, used to maintain airport_stats.unique_airlines
+CREATE TABLE IF NOT EXISTS airport_airline_routes (
+    "Airport_ID" INT,
+    "Airline" VARCHAR(10),
+    route_count INT NOT NULL,
+    PRIMARY KEY ("Airport_ID", "Airline")
+);
+
+-- Per-country outgoing and domestic route counts (by the country of the source airport).
+-- The country rollups find the airports of a route by Source_airport_ID and
+-- Destination_airport_ID, like notebook Q6, whereas notebook Q7 and Q10 join on the
+-- IATA codes in Source_airport and Destination_airport. The two differ for routes whose
+-- code is not the IATA code of the airport their ID points to, which changes the counts
+-- of 8 countries (see "Rollup Tables" in the README).
+CREATE TABLE IF NOT EXISTS country_stats (
+    "Country" VARCHAR(255) PRIMARY KEY,
+    outgoing_routes INT NOT NULL DEFAULT 0,
+    domestic_routes INT NOT NULL DEFAULT 0
+);
+
+-- Number of routes per origin and destination country, used for reachable countries (Q7)
+CREATE TABLE IF NOT EXISTS country_pair_routes (
+    origin_country VARCHAR(255),
+    destination_country VARCHAR(255),
+    route_count INT NOT NULL,
+    PRIMARY KEY (origin_country, destination_country)
+);
+
+
+-- Rebuilds every rollup from scratch
+CREATE OR REPLACE FUNCTION refresh_rollups() RETURNS void LANGUAGE sql AS $$
+    TRUNCATE airport_stats, airport_airline_routes, country_stats, country_pair_routes;
+
+    INSERT INTO airport_airline_routes ("Airport_ID", "Airline", route_count)
+    SELECT airport_id, airline, COUNT(*)
+    FROM (
+        SELECT "Source_airport_ID" AS airport_id, "Airline" AS airline FROM routes
+        UNION ALL
+        SELECT "Destination_airport_ID", "Airline" FROM routes
+        WHERE "Destination_airport_ID" <> "Source_airport_ID"
+    ) touches
+    WHERE airline IS NOT NULL
+    GROUP BY airport_id, airline;
+
+    INSERT INTO airport_stats ("Airport_ID", outgoing_routes, incoming_routes, total_routes, unique_airlines)
+    SELECT
+        a."Airport_ID",
+        COALESCE(o.n, 0),
+        COALESCE(i.n, 0),
+        COALESCE(o.n, 0) + COALESCE(i.n, 0) - COALESCE(s.n, 0),
+        COALESCE(u.n, 0)
+    FROM airports a
+    LEFT JOIN (SELECT "Source_airport_ID" AS id, COUNT(*) AS n FROM routes GROUP BY 1) o ON o.id = a."Airport_ID"
+    LEFT JOIN (SELECT "Destination_airport_ID" AS id, COUNT(*) AS n FROM routes GROUP BY 1) i ON i.id = a."Airport_ID"
+    LEFT JOIN (SELECT "Source_airport_ID" AS id, COUNT(*) AS n FROM routes
+               WHERE "Source_airport_ID" = "Destination_airport_ID" GROUP BY 1) s ON s.id = a."Airport_ID"
+    LEFT JOIN (SELECT "Airport_ID" AS id, COUNT(*) AS n FROM airport_airline_routes GROUP BY 1) u ON u.id = a."Airport_ID";
+
+    INSERT INTO country_pair_routes (origin_country, destination_country, route_count)
+    SELECT src."Country", dst."Country", COUNT(*)
+    FROM routes r
+    JOIN airports src ON src."Airport_ID" = r."Source_airport_ID"
+    JOIN airports dst ON dst."Airport_ID" = r."Destination_airport_ID"
+    WHERE src."Country" IS NOT NULL AND dst."Country" IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO country_stats ("Country", outgoing_routes, domestic_routes)
+    SELECT src."Country", COUNT(*), COUNT(*) FILTER (WHERE src."Country" = dst."Country")
+    FROM routes r
+    JOIN airports src ON src."Airport_ID" = r."Source_airport_ID"
+    JOIN airports dst ON dst."Airport_ID" = r."Destination_airport_ID"
+    WHERE src."Country" IS NOT NULL
+    GROUP BY 1;
+$$;
+
+
+-- Applies the rows in routes_rollup_delta (sign +1 for added routes, -1 for removed ones)
+CREATE OR REPLACE FUNCTION apply_routes_rollup_delta() RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    -- Airport route counts
+    INSERT INTO airport_stats AS s ("Airport_ID", outgoing_routes, incoming_routes, total_routes)
+    SELECT airport_id, SUM(outgoing), SUM(incoming), SUM(total)
+    FROM (
+        SELECT "Source_airport_ID" AS airport_id, sign AS outgoing, 0 AS incoming, sign AS total
+        FROM routes_rollup_delta
+        UNION ALL
+        SELECT "Destination_airport_ID", 0, sign,
+               CASE WHEN "Destination_airport_ID" = "Source_airport_ID" THEN 0 ELSE sign END
+        FROM routes_rollup_delta
+    ) touches
+    GROUP BY airport_id
+    ON CONFLICT ("Airport_ID") DO UPDATE SET
+        outgoing_routes = s.outgoing_routes + EXCLUDED.outgoing_routes,
+        incoming_routes = s.incoming_routes + EXCLUDED.incoming_routes,
+        total_routes = s.total_routes + EXCLUDED.total_routes;
+
+    -- Routes per airport and airline
+    INSERT INTO airport_airline_routes AS p ("Airport_ID", "Airline", route_count)
+    SELECT airport_id, airline, SUM(sign)
+    FROM (
+        SELECT "Source_airport_ID" AS airport_id, "Airline" AS airline, sign FROM routes_rollup_delta
+        UNION ALL
+        SELECT "Destination_airport_ID", "Airline", sign FROM routes_rollup_delta
+        WHERE "Destination_airport_ID" <> "Source_airport_ID"
+    ) touches
+    WHERE airline IS NOT NULL
+    GROUP BY airport_id, airline
+    ON CONFLICT ("Airport_ID", "Airline") DO UPDATE SET
+        route_count = p.route_count + EXCLUDED.route_count;
+
+    DELETE FROM airport_airline_routes WHERE route_count <= 0;
+
+    -- Distinct airlines, recounted only for the airports that were touched
+    UPDATE airport_stats s
+    SET unique_airlines = (
+        SELECT COUNT(*) FROM airport_airline_routes p WHERE p."Airport_ID" = s."Airport_ID"
+    )
+    WHERE s."Airport_ID" IN (
+        SELECT "Source_airport_ID" FROM routes_rollup_delta
+        UNION
+        SELECT "Destination_airport_ID" FROM routes_rollup_delta
+    );
+
+    -- Country pairs
+    INSERT INTO country_pair_routes AS c (origin_country, destination_country, route_count)
+    SELECT src."Country", dst."Country", SUM(d.sign)
+    FROM routes_rollup_delta d
+    JOIN airports src ON src."Airport_ID" = d."Source_airport_ID"
+    JOIN airports dst ON dst."Airport_ID" = d."Destination_airport_ID"
+    WHERE src."Country" IS NOT NULL AND dst."Country" IS NOT NULL
+    GROUP BY 1, 2
+    ON CONFLICT (origin_country, destination_country) DO UPDATE SET
+        route_count = c.route_count + EXCLUDED.route_count;
+
+    DELETE FROM country_pair_routes WHERE route_count <= 0;
+
+    -- Country outgoing and domestic routes
+    INSERT INTO country_stats AS c ("Country", outgoing_routes, domestic_routes)
+    SELECT src."Country", SUM(d.sign), COALESCE(SUM(d.sign) FILTER (WHERE src."Country" = dst."Country"), 0)
+    FROM routes_rollup_delta d
+    JOIN airports src ON src."Airport_ID" = d."Source_airport_ID"
+    JOIN airports dst ON dst."Airport_ID" = d."Destination_airport_ID"
+    WHERE src."Country" IS NOT NULL
+    GROUP BY 1
+    ON CONFLICT ("Country") DO UPDATE SET
+        outgoing_routes = c.outgoing_routes + EXCLUDED.outgoing_routes,
+        domestic_routes = c.domestic_routes + EXCLUDED.domestic_routes;
+
+    DELETE FROM country_stats WHERE outgoing_routes <= 0;
+END;
+$$;
+
+
+-- Statement-level trigger: collects the changed rows of one statement (INSERT, UPDATE,
+-- DELETE or COPY) from the transition tables and applies them in one go
+CREATE OR REPLACE FUNCTION routes_rollup_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF to_regclass('pg_temp.routes_rollup_delta') IS NULL THEN
+        CREATE TEMP TABLE routes_rollup_delta (
+            "Source_airport_ID" INT,
+            "Destination_airport_ID" INT,
+            "Airline" VARCHAR(10),
+            sign INT
+        ) ON COMMIT DELETE ROWS;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO routes_rollup_delta
+        SELECT "Source_airport_ID", "Destination_airport_ID", "Airline", 1 FROM new_rows;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        INSERT INTO routes_rollup_delta
+        SELECT "Source_airport_ID", "Destination_airport_ID", "Airline", -1 FROM old_rows;
+    END IF;
+
+    PERFORM apply_routes_rollup_delta();
+    DELETE FROM routes_rollup_delta;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS routes_rollup_insert ON routes;
+DROP TRIGGER IF EXISTS routes_rollup_update ON routes;
+DROP TRIGGER IF EXISTS routes_rollup_delete ON routes;
+
+CREATE TRIGGER routes_rollup_insert AFTER INSERT ON routes
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION routes_rollup_trigger();
+CREATE TRIGGER routes_rollup_update AFTER UPDATE ON routes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION routes_rollup_trigger();
+CREATE TRIGGER routes_rollup_delete AFTER DELETE ON routes
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION routes_rollup_trigger();
+
+
+-- Dashboard views on top of the rollups
+
+-- Busiest airport (most inbound + outbound routes) per country and its airline count (Q4)
+CREATE OR REPLACE VIEW country_busiest_airport AS
+SELECT DISTINCT ON (a."Country")
+    a."Country",
+    a."Airport_ID",
+    a."Name",
+    a."City",
+    s.total_routes AS route_count,
+    s.unique_airlines
+FROM airport_stats s
+JOIN airports a ON a."Airport_ID" = s."Airport_ID"
+ORDER BY a."Country", s.total_routes DESC;
+
+-- Outgoing/incoming disparity per airport (Q5)
+CREATE OR REPLACE VIEW airport_route_disparity AS
+SELECT
+    a."Airport_ID",
+    a."Name",
+    a."City",
+    a."Country",
+    s.outgoing_routes AS outgoing_count,
+    s.incoming_routes AS incoming_count,
+    ABS(s.outgoing_routes - s.incoming_routes) AS disparity
+FROM airport_stats s
+JOIN airports a ON a."Airport_ID" = s."Airport_ID";
+
+-- Number of destination countries reachable with a direct route (Q7, by airport ID)
+CREATE OR REPLACE VIEW country_reachable_countries AS
+SELECT origin_country, COUNT(*) AS reachable_countries
+FROM country_pair_routes
+GROUP BY origin_country;
+
+-- Domestic share of outgoing routes (Q10, by airport ID)
+CREATE OR REPLACE VIEW country_domestic_share AS
+SELECT
+    "Country" AS country,
+    outgoing_routes AS total_routes,
+    domestic_routes,
+    domestic_routes::FLOAT / NULLIF(outgoing_routes, 0) AS domestic_share
+FROM country_stats;
+
+
+SELECT refresh_rollups();
@@ -0,0 +1,74 @@
+-- routes_enriched: one row per route with the country data of both ends, resolved
+-- once through the integer airport IDs. Country-level questions (Q6, Q7, Q8, Q10)
+-- become scans of this one table instead of joining airports and countries on
+-- every query.
+-- Runs after ingestion.sql and rollups.sql (scripts in /docker-entrypoint-initdb.d/
+-- run in alphabetical order), is re-run by ingestion/bulk_load.py after a reload and
+-- is refreshed by ingestion/delta_load.py.
+
+CREATE TABLE IF NOT EXISTS routes_enriched (
+    "Routes_ID" INT PRIMARY KEY,
+    "Airline" VARCHAR(10),
+    "Airline_ID" INT NOT NULL,
+    "Source_airport_ID" INT NOT NULL,
+    "Destination_airport_ID" INT NOT NULL,
+    "Stops" INT NOT NULL,
+    "Distance_km" FLOAT,
+    "Source_country" VARCHAR(255),
+    "Destination_country" VARCHAR(255),
+    "Domestic" BOOLEAN, -- NULL if the country of either airport is unknown
+    "Source_GDP_per_capita" FLOAT,
+    "Source_population" FLOAT,
+    "Source_political_stability" FLOAT,
+    "Destination_GDP_per_capita" FLOAT,
+    "Destination_population" FLOAT,
+    "Destination_political_stability" FLOAT
+);
+
+CREATE INDEX IF NOT EXISTS routes_enriched_source_country_idx ON routes_enriched ("Source_country");
+CREATE INDEX IF NOT EXISTS routes_enriched_destination_country_idx ON routes_enriched ("Destination_country");
+
+
+-- Rebuilds the rows of some routes, or of every route if route_ids is NULL.
+-- Routes in route_ids that no longer exist are removed.
+CREATE OR REPLACE FUNCTION refresh_routes_enriched(route_ids INT[] DEFAULT NULL) RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF route_ids IS NULL THEN
+        TRUNCATE routes_enriched;
+    ELSE
+        DELETE FROM routes_enriched WHERE "Routes_ID" = ANY(route_ids);
+    END IF;
+
+    INSERT INTO routes_enriched
+    SELECT
+        r."Routes_ID",
+        r."Airline",
+        r."Airline_ID",
+        r."Source_airport_ID",
+        r."Destination_airport_ID",
+        r."Stops",
+        r."Distance_km",
+        src_a."Country",
+        dst_a."Country",
+        src_a."Country" = dst_a."Country",
+        src_c."GDP_per_capita_current_US",
+        src_c."Population",
+        src_c."Political_Stability",
+        dst_c."GDP_per_capita_current_US",
+        dst_c."Population",
+        dst_c."Political_Stability"
+    FROM routes r
+    JOIN airports src_a ON src_a."Airport_ID" = r."Source_airport_ID"
+    JOIN airports dst_a ON dst_a."Airport_ID" = r."Destination_airport_ID"
+    LEFT JOIN countries src_c ON src_c."Country_Name" = src_a."Country"
+    LEFT JOIN countries dst_c ON dst_c."Country_Name" = dst_a."Country"
+    WHERE route_ids IS NULL OR r."Routes_ID" = ANY(route_ids);
+
+    IF route_ids IS NULL THEN
+        ANALYZE routes_enriched;
+    END IF;
+END;
+$$;
+
+
+SELECT refresh_routes_enriched();
@@ -0,0 +1,124 @@
+-- Route snapshots: routes_history keeps the routes of several periods side by side,
+-- one partition per snapshot date, optionally sub-partitioned by the region of the
+-- source airport. Queries that filter on "Snapshot_date" (and "Source_region") only
+-- scan the matching partitions. Snapshots are attached and retired with
+-- ingestion/snapshots.py.
+-- Runs after ingestion.sql and rollups.sql (scripts in /docker-entrypoint-initdb.d/
+-- run in alphabetical order), stores the ingested routes as the first snapshot and
+-- is safe to re-run.
+
+-- One row per attached snapshot
+CREATE TABLE IF NOT EXISTS route_snapshots (
+    "Snapshot_date" DATE PRIMARY KEY,
+    "Label" VARCHAR(255) NOT NULL,
+    "By_region" BOOLEAN NOT NULL,
+    "Row_count" BIGINT NOT NULL,
+    "Loaded_at" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- The columns of routes, prefixed with the partition keys
+CREATE TABLE IF NOT EXISTS routes_history (
+    "Snapshot_date" DATE NOT NULL,
+    "Source_region" VARCHAR(32) NOT NULL,
+    "Routes_ID" INT NOT NULL,
+    "Airline" VARCHAR(10),
+    "Airline_ID" INT NOT NULL,
+    "Source_airport" VARCHAR(10),
+    "Source_airport_ID" INT NOT NULL,
+    "Destination_airport" VARCHAR(10),
+    "Destination_airport_ID" INT NOT NULL,
+    "Codeshare" BIT(1),
+    "Stops" INT NOT NULL CHECK ("Stops" >= 0),
+    "Equipment" VARCHAR(255),
+    "Distance_km" FLOAT CHECK ("Distance_km" >= 0),
+    PRIMARY KEY ("Snapshot_date", "Source_region", "Routes_ID")
+) PARTITION BY LIST ("Snapshot_date");
+
+-- Created on every partition when it is attached
+CREATE INDEX IF NOT EXISTS routes_history_source_airport_idx ON routes_history ("Source_airport_ID");
+CREATE INDEX IF NOT EXISTS routes_history_destination_airport_idx ON routes_history ("Destination_airport_ID");
+CREATE INDEX IF NOT EXISTS routes_history_airline_idx ON routes_history ("Airline_ID");
+
+
+-- Region of an airport: the first part of its tz database time zone
+-- (Europe, America, Asia, ...), or 'Unknown'
+CREATE OR REPLACE FUNCTION airport_region(tz_name TEXT) RETURNS TEXT LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE WHEN tz_name LIKE '%/%' THEN split_part(tz_name, '/', 1) ELSE 'Unknown' END
+$$;
+
+
+-- Attached partitions never change, so the list of snapshots identifies the content
+-- of routes_history without reading it (see clean_data/versions.sql)
+CREATE OR REPLACE FUNCTION record_routes_history_version() RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    IF to_regclass('data_versions') IS NULL THEN
+        RETURN;
+    END IF;
+    INSERT INTO data_versions (table_name, checksum, row_count, recorded_at)
+    SELECT 'routes_history',
+           md5(COALESCE(string_agg(s::text, ',' ORDER BY s."Snapshot_date"), '')),
+           COALESCE(SUM(s."Row_count"), 0),
+           now()
+    FROM route_snapshots s
+    ON CONFLICT (table_name) DO UPDATE SET
+        checksum = EXCLUDED.checksum,
+        row_count = EXCLUDED.row_count,
+        recorded_at = EXCLUDED.recorded_at;
+END;
+$$;
+
+
+-- Copies the routes of source_table (same columns as routes) into a new partition
+-- and attaches it as the snapshot of snapshot_date. The partition is filled before
+-- it is attached, so readers of routes_history never see a partial snapshot.
+-- With by_region, the partition is split into one sub-partition per source region.
+-- Returns the number of routes in the snapshot. source_table has no default: a regclass
+-- default would keep pointing at the routes table that a bulk load replaces.
+CREATE OR REPLACE FUNCTION attach_routes_snapshot(
+    snapshot_date DATE,
+    snapshot_label TEXT,
+    source_table REGCLASS,
+    by_region BOOLEAN DEFAULT false
+)
+RETURNS BIGINT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    partition_name TEXT := 'routes_' || to_char(snapshot_date, 'YYYYMMDD');
+    source_join TEXT := format('%s r LEFT JOIN airports a ON a."Airport_ID" = r."Source_airport_ID"', source_table);
+    region TEXT;
+    loaded_rows BIGINT;
+BEGIN
+    IF by_region THEN
+        EXECUTE format('CREATE TABLE %I (LIKE routes_history INCLUDING CONSTRAINTS) PARTITION BY LIST ("Source_region")', partition_name);
+        FOR region IN EXECUTE 'SELECT DISTINCT airport_region(a."Tz_database_time_zone") FROM ' || source_join LOOP
+            EXECUTE format('CREATE TABLE %I PARTITION OF %I FOR VALUES IN (%L)',
+                           partition_name || '_' || lower(region), partition_name, region);
+        END LOOP;
+        -- Catches regions of routes added to the partition later
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', partition_name || '_other', partition_name);
+    ELSE
+        EXECUTE format('CREATE TABLE %I (LIKE routes_history INCLUDING CONSTRAINTS)', partition_name);
+    END IF;
+
+    EXECUTE format('INSERT INTO %I SELECT %L::date, airport_region(a."Tz_database_time_zone"), r.* FROM %s',
+                   partition_name, snapshot_date, source_join);
+    GET DIAGNOSTICS loaded_rows = ROW_COUNT;
+
+    -- With a matching constraint in place, ATTACH does not scan the partition again
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I CHECK ("Snapshot_date" = %L)',
+                   partition_name, partition_name || '_date_check', snapshot_date);
+    EXECUTE format('ALTER TABLE routes_history ATTACH PARTITION %I FOR VALUES IN (%L)', partition_name, snapshot_date);
+    EXECUTE format('ANALYZE %I', partition_name);
+
+    INSERT INTO route_snapshots ("Snapshot_date", "Label", "By_region", "Row_count")
+    VALUES (snapshot_date, snapshot_label, by_region, loaded_rows);
+    PERFORM record_routes_history_version();
+    RETURN loaded_rows;
+END;
+$$;
+
+
+-- The ingested routes are the first snapshot (the Kaggle data is valid for 2022)
+SELECT attach_routes_snapshot(DATE '2022-01-01', '2022', 'routes')
+WHERE to_regclass('routes') IS NOT NULL AND NOT EXISTS (SELECT 1 FROM route_snapshots);
@@ -0,0 +1,52 @@
+-- Records a checksum of every ingested table, so that cached query results can be
+-- invalidated when, and only when, the data of a table they read has changed.
+-- Runs after the other scripts in clean_data (scripts in /docker-entrypoint-initdb.d/
+-- run in alphabetical order) and is re-run by ingestion/bulk_load.py after a reload.
+
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name TEXT PRIMARY KEY,
+    checksum TEXT NOT NULL,
+    row_count BIGINT NOT NULL,
+    recorded_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Checksum of a table's content, independent of the physical row order
+CREATE OR REPLACE FUNCTION record_data_version(target_table TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    table_checksum TEXT;
+    table_rows BIGINT;
+BEGIN
+    EXECUTE format(
+        'SELECT md5(COALESCE(string_agg(row_hash, '''' ORDER BY row_hash), '''')), COUNT(*)
+         FROM (SELECT md5(t::text) AS row_hash FROM %I t) hashes',
+        target_table
+    ) INTO table_checksum, table_rows;
+
+    INSERT INTO data_versions (table_name, checksum, row_count, recorded_at)
+    VALUES (target_table, table_checksum, table_rows, now())
+    ON CONFLICT (table_name) DO UPDATE SET
+        checksum = EXCLUDED.checksum,
+        row_count = EXCLUDED.row_count,
+        recorded_at = EXCLUDED.recorded_at;
+    RETURN table_checksum;
+END;
+$$;
+
+
+SELECT record_data_version(table_name)
+FROM unnest(ARRAY['countries', 'airlines', 'airplanes', 'airports', 'routes']) AS table_name;
+
+-- Built from the tables above (clean_data/routes_enriched.sql)
+SELECT record_data_version('routes_enriched') WHERE to_regclass('routes_enriched') IS NOT NULL;
+
+-- routes_history is versioned by its list of snapshots (clean_data/snapshots.sql)
+DO $$
+BEGIN
+    IF to_regprocedure('record_routes_history_version()') IS NOT NULL THEN
+        PERFORM record_routes_history_version();
+    END IF;
+END;
+$$;
@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections import namedtuple
+
+from instrumentation import REPORT_DIR, RunReport
+from normalize_countries import normalize_countries
+from remove_duplicates import remove_duplicate_codes
+from route_distances import add_route_distances
+from routes_pipeline import run_routes_pipeline
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+CACHE_DIR = os.path.join(REPO_DIR, '.build_cache')
+
+# A build stage: `run` is called with the input paths followed by the output paths.
+# Paths are relative to the repository root and are the ones the scripts use.
+# `code` lists the scripts whose source is part of the stage's cache key.
+Stage = namedtuple('Stage', ['name', 'inputs', 'outputs', 'run', 'code'])
+
+# In dependency order. An input that is the output of an earlier stage is taken from
+# the cache; every other input is read from disk.
+# country_city_matching.py is not a stage: mapped_gdp_countries.csv was corrected by
+# hand after the fuzzy matching, so it is treated as a source file. Run on its own, it
+# writes a run report like the stages.
+STAGES = [
+    Stage(
+        name='normalize_countries',
+        inputs=['clean_data_mappings/mapped_gdp_countries.csv', 'source_data/airports.csv',
+                'source_data/airlines.csv', 'source_data/country_gdp.csv'],
+        outputs=['clean_data/airports.csv', 'clean_data/airlines.csv', 'clean_data/aligned_gdp.csv',
+                 'clean_data/aligned_gdp_airlines.csv', 'clean_data_mappings/country_alignment.csv'],
+        run=normalize_countries,
+        code=['normalize_countries.py', 'reference_index.py'],
+    ),
+    Stage(
+        name='remove_duplicates',
+        inputs=['clean_data/airplanes.csv'],
+        outputs=['clean_data/airplanes.csv'],
+        run=remove_duplicate_codes,
+        code=['remove_duplicates.py'],
+    ),
+    Stage(
+        name='routes_pipeline',
+        inputs=['source_data/routes.csv', 'clean_data/airlines.csv', 'clean_data/airports.csv', 'clean_data/airplanes.csv'],
+        outputs=['clean_data/routes.csv'],
+        run=run_routes_pipeline,
+        code=['routes_pipeline.py', 'clean_routes.py', 'remove_invalid_airline_routes.py',
+              'transform_codeshare.py', 'validate_routes_data.py', 'reference_index.py'],
+    ),
+    Stage(
+        name='route_distances',
+        inputs=['clean_data/routes.csv', 'clean_data/airports.csv'],
+        outputs=['clean_data/routes.csv'],
+        run=add_route_distances,
+        code=['route_distances.py', 'routes_columnar.py'],
+    ),
+]
+
+# Intermediate artifacts that are never copied to clean_data
+INTERMEDIATE_OUTPUTS = set()
+
+
+def hash_file(file_path):
+    """
+    Computes the SHA-256 of a file's contents.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as infile:
+        for block in iter(lambda: infile.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def object_path(cache_dir, content_hash):
+    """Returns the path of a content-addressed object in the cache."""
+    return os.path.join(cache_dir, 'objects', content_hash[:2], content_hash[2:])
+
+
+def store_object(cache_dir, file_path):
+    """
+    Moves a file into the content-addressed object store.
+
+    Args:
+        cache_dir (str): Path to the build cache directory.
+        file_path (str): File to store.
+
+    Returns:
+        str: The content hash of the stored file.
+    """
+    content_hash = hash_file(file_path)
+    target_path = object_path(cache_dir, content_hash)
+    if os.path.exists(target_path):
+        os.remove(file_path)
+    else:
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        shutil.move(file_path, target_path)
+    return content_hash
+
+
+def load_manifest(cache_dir):
+    """Loads the stage key -> output hashes manifest, or an empty one."""
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, mode='r', encoding='utf-8') as infile:
+        return json.load(infile)
+
+
+def save_manifest(cache_dir, manifest):
+    """Writes the manifest atomically."""
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    tmp_manifest_path = manifest_path + '.tmp'
+    with open(tmp_manifest_path, mode='w', encoding='utf-8') as outfile:
+        json.dump(manifest, outfile, indent=2, sort_keys=True)
+    os.replace(tmp_manifest_path, manifest_path)
+
+
+def stage_key(stage, input_hashes):
+    """
+    Computes the cache key of a stage from its name, the hashes of its scripts
+    and the hashes of its inputs.
+
+    Args:
+        stage (Stage): The stage.
+        input_hashes (list): Content hashes of the stage inputs, in order.
+
+    Returns:
+        str: Hex digest identifying this exact stage run.
+    """
+    digest = hashlib.sha256(stage.name.encode('utf-8'))
+    for script in stage.code:
+        digest.update(hash_file(os.path.join(SCRIPT_DIR, script)).encode('ascii'))
+    for input_hash in input_hashes:
+        digest.update(input_hash.encode('ascii'))
+    return digest.hexdigest()
+
+
+def build(stages=STAGES, repo_dir=REPO_DIR, cache_dir=CACHE_DIR, force=False, report=None):
+    """
+    Runs the stages whose inputs or scripts changed since they were last built and
+    reuses the cached outputs of all other stages. Inputs and outputs never get
+    modified in place: every output is written to a temporary directory and then
+    moved into the content-addressed object store in the cache directory.
+
+    Args:
+        stages (list): Stages in dependency order.
+        repo_dir (str): Directory that the stage paths are relative to.
+        cache_dir (str): Path to the build cache directory.
+        force (bool): Re-run every stage even if it is cached.
+        report (RunReport): Collects the metrics of every stage. Defaults to a new report.
+
+    Returns:
+        dict: Output path -> content hash of every artifact that was built.
+    """
+    report = report if report is not None else RunReport('build')
+    os.makedirs(cache_dir, exist_ok=True)
+    manifest = load_manifest(cache_dir)
+    artifacts = {}
+
+    for stage in stages:
+        input_paths = []
+        input_hashes = []
+        for input_name in stage.inputs:
+            if input_name in artifacts:
+                input_path = object_path(cache_dir, artifacts[input_name])
+            else:
+                input_path = os.path.join(repo_dir, input_name)
+                if not os.path.exists(input_path):
+                    raise FileNotFoundError(f"Input {input_name} of stage {stage.name} not found")
+            input_paths.append(input_path)
+            input_hashes.append(hash_file(input_path))
+
+        key = stage_key(stage, input_hashes)
+        cached = manifest.get(key)
+        if not force and cached and all(os.path.exists(object_path(cache_dir, h)) for h in cached.values()):
+            print(f"[{stage.name}] up to date")
+            report.skip(stage.name)
+            artifacts.update(cached)
+            continue
+
+        print(f"[{stage.name}] running")
+        with tempfile.TemporaryDirectory(dir=cache_dir) as work_dir, report.stage(stage.name) as metrics:
+            output_paths = [os.path.join(work_dir, os.path.basename(output)) for output in stage.outputs]
+            stage.run(*input_paths, *output_paths)
+            if metrics.failed:
+                raise RuntimeError(f"Stage {stage.name} failed: {metrics.error}")
+
+            outputs = {}
+            for output_name, output_path in zip(stage.outputs, output_paths):
+                # The scripts report their own errors and return, so a missing output means the stage failed
+                if not os.path.exists(output_path):
+                    raise RuntimeError(f"Stage {stage.name} did not produce {output_name}")
+                outputs[output_name] = store_object(cache_dir, output_path)
+
+        print(f"[{stage.name}] {metrics.wall_seconds:.2f}s, {metrics.rows_in} rows in, {metrics.rows_out} rows out, "
+              f"{sum(metrics.rejected.values())} rejected")
+        manifest[key] = outputs
+        save_manifest(cache_dir, manifest)
+        artifacts.update(outputs)
+
+    return artifacts
+
+
+def publish(artifacts, repo_dir=REPO_DIR, cache_dir=CACHE_DIR):
+    """
+    Copies the built artifacts to their paths in the repository, skipping
+    intermediate artifacts and files that are already identical.
+
+    Args:
+        artifacts (dict): Output path -> content hash, as returned by build().
+        repo_dir (str): Directory that the artifact paths are relative to.
+        cache_dir (str): Path to the build cache directory.
+    """
+    for output_name, content_hash in artifacts.items():
+        if output_name in INTERMEDIATE_OUTPUTS:
+            continue
+        target_path = os.path.join(repo_dir, output_name)
+        if os.path.exists(target_path) and hash_file(target_path) == content_hash:
+            continue
+        tmp_target_path = target_path + '.tmp'
+        shutil.copyfile(object_path(cache_dir, content_hash), tmp_target_path)
+        os.replace(tmp_target_path, target_path)
+        print(f"Published {output_name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the clean_data artifacts.")
+    parser.add_argument('--force', action='store_true', help="re-run every stage")
+    parser.add_argument('--publish', action='store_true',
+                        help="copy the built artifacts into clean_data (overwrites hand-made fixes)")
+    parser.add_argument('--report-dir', default=REPORT_DIR, help="directory for the JSON run report")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the stages and save the profile of the slowest one next to the report")
+    args = parser.parse_args()
+
+    run_report = RunReport('build', profile=args.profile)
+    try:
+        built_artifacts = build(force=args.force, report=run_report)
+        for name, artifact_hash in built_artifacts.items():
+            print(f"  {name} -> {object_path(CACHE_DIR, artifact_hash)}")
+        if args.publish:
+            publish(built_artifacts)
+    except Exception as e:
+        run_report.error = f"{type(e).__name__}: {e}"
+        print(f"Build failed: {run_report.error}")
+    print(f"Run report written to {run_report.write(args.report_dir)}")
+    if run_report.failed:
+        sys.exit(1)
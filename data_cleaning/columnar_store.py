@@ -0,0 +1,237 @@
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CLEAN_TABLES = ['airlines', 'airplanes', 'airports', 'aligned_gdp', 'routes']
+
+# Version 2 records the source dtype of every column; version 1 tables load without it
+FORMAT_VERSION = 2
+
+# Python types of the values that a dictionary column can hold, and how they are read back
+_DICTIONARY_VALUE_TYPES = {
+    'str': str,
+    'bool': lambda text: text == 'True',
+    'date': datetime.date.fromisoformat,
+}
+
+
+def _smallest_int_dtype(array):
+    """Returns the smallest signed integer dtype that holds every value of array."""
+    if len(array) == 0:
+        return np.int8
+    for dtype in (np.int8, np.int16, np.int32, np.int64):
+        if array.min() >= np.iinfo(dtype).min and array.max() <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _save_dictionary(categories, file_prefix):
+    """
+    Stores the distinct values of a text column as one UTF-8 blob plus an array of
+    offsets, so the dictionary takes as many bytes as its text and not
+    len(categories) times the longest value.
+    """
+    encoded = [category.encode('utf-8') for category in categories]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    np.save(f'{file_prefix}_dict_offsets.npy', offsets.astype(_smallest_int_dtype(offsets)))
+    np.save(f'{file_prefix}_dict_data.npy', np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+
+def _load_dictionary(file_prefix):
+    """Loads a dictionary written by _save_dictionary."""
+    offsets = np.load(f'{file_prefix}_dict_offsets.npy')
+    data = np.load(f'{file_prefix}_dict_data.npy').tobytes()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+
+def _dictionary_value_type(values, column):
+    """
+    Name of the type of the values of a text-like column, from _DICTIONARY_VALUE_TYPES.
+
+    Raises:
+        TypeError: If the column holds values of another type or of several types.
+    """
+    value_types = {type(value) for value in values.dropna().unique()}
+    for name, allowed in (('str', {str, np.str_}), ('bool', {bool, np.bool_}), ('date', {datetime.date})):
+        if value_types <= allowed:
+            return name
+    names = ', '.join(sorted(value_type.__name__ for value_type in value_types))
+    raise TypeError(f"Column {column!r} holds {names} values, which the columnar format cannot store")
+
+
+def export_table(df, table_dir):
+    """
+    Writes a DataFrame as a directory of .npy files, one per column, and records
+    the dtype of every column so that load_table(..., decode=True) returns the
+    same DataFrame.
+    Numeric and boolean columns are stored as they are, with integers in the
+    smallest dtype that fits. Datetime columns are stored as int64 ticks. Text
+    columns (IATA/ICAO codes, countries, equipment, names, ...) are
+    dictionary-encoded: the distinct values are stored once and each row only
+    keeps a small integer code (-1 for missing values). Object columns of
+    booleans or dates are dictionary-encoded as well.
+
+    Args:
+        df (pd.DataFrame): Table to export.
+        table_dir (str): Output directory for the table.
+
+    Raises:
+        TypeError: If a column has a type that cannot be stored, e.g. timedeltas
+            or Decimal objects.
+    """
+    os.makedirs(table_dir, exist_ok=True)
+    columns = []
+    for column_idx, column in enumerate(df.columns):
+        values = df.iloc[:, column_idx]
+        file_name = f'col_{column_idx:03d}'
+        file_prefix = os.path.join(table_dir, file_name)
+        entry = {'name': column, 'file': file_name, 'dtype': str(values.dtype)}
+        if pd.api.types.is_datetime64_any_dtype(values):
+            np.save(f'{file_prefix}.npy', pd.DatetimeIndex(values).asi8)
+            entry['kind'] = 'datetime'
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+            if isinstance(values.dtype, np.dtype):
+                array = values.to_numpy()
+            else:
+                # Nullable extension dtypes (Int64, boolean, ...): missing values become NaN
+                array = values.to_numpy(dtype=float, na_value=np.nan)
+            if pd.api.types.is_integer_dtype(array):
+                array = array.astype(_smallest_int_dtype(array))
+            np.save(f'{file_prefix}.npy', array)
+            entry['kind'] = 'numeric'
+        elif (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)
+              or isinstance(values.dtype, pd.CategoricalDtype)):
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Keeps the categories that no row uses, and their order
+                categorical = values.array
+                entry['ordered'] = bool(categorical.ordered)
+                value_type = _dictionary_value_type(pd.Series(categorical.categories), column)
+            else:
+                categorical = pd.Categorical(values.astype('object').where(values.notna(), None))
+                value_type = _dictionary_value_type(values, column)
+            np.save(f'{file_prefix}.npy', categorical.codes)
+            _save_dictionary([str(category) for category in categorical.categories], file_prefix)
+            entry['kind'] = 'dictionary'
+            entry['values'] = value_type
+        else:
+            raise TypeError(f"Column {column!r} has dtype {values.dtype}, which the columnar format cannot store")
+        columns.append(entry)
+
+    meta = {'format_version': FORMAT_VERSION, 'num_rows': len(df), 'columns': columns}
+    with open(os.path.join(table_dir, 'meta.json'), mode='w', encoding='utf-8') as outfile:
+        json.dump(meta, outfile, indent=2)
+
+
+def _load_datetimes(array, dtype):
+    """Datetime column from the int64 ticks written by export_table."""
+    dtype = pd.api.types.pandas_dtype(dtype)
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        values = pd.Series(np.asarray(array).view(f'datetime64[{dtype.unit}]'))
+        return values.dt.tz_localize('UTC').dt.tz_convert(dtype.tz)
+    return pd.Series(np.asarray(array).view(dtype))
+
+
+def load_table(table_dir, columns=None, decode=False):
+    """
+    Loads a table written by export_table. Column arrays are memory-mapped, so
+    nothing is parsed and only the pages that are used are read from disk.
+
+    Args:
+        table_dir (str): Directory of the table.
+        columns (list): Optional subset of column names to load.
+        decode (bool): Return every column with the dtype it was exported with.
+            Otherwise integers keep their narrowed storage dtype and text
+            columns are pandas categoricals, which saves memory but means that
+            integer arithmetic can overflow.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
+    with open(os.path.join(table_dir, 'meta.json'), mode='r', encoding='utf-8') as infile:
+        meta = json.load(infile)
+    if not 1 <= meta['format_version'] <= FORMAT_VERSION:
+        raise ValueError(f"Unsupported columnar format version {meta['format_version']} in {table_dir}")
+
+    names = []
+    data = []
+    for column in meta['columns']:
+        if columns is not None and column['name'] not in columns:
+            continue
+        file_prefix = os.path.join(table_dir, column['file'])
+        array = np.load(f'{file_prefix}.npy', mmap_mode='r')
+        dtype = column.get('dtype')
+        if column['kind'] == 'datetime':
+            values = _load_datetimes(array, dtype)
+        elif column['kind'] == 'dictionary':
+            parse = _DICTIONARY_VALUE_TYPES[column.get('values', 'str')]
+            categories = [parse(category) for category in _load_dictionary(file_prefix)]
+            if decode and dtype == 'category':
+                values = pd.Categorical.from_codes(array, categories=pd.Index(categories),
+                                                   ordered=column.get('ordered', False))
+            elif decode:
+                # The last slot is picked by the code -1 of missing values
+                lookup = np.empty(len(categories) + 1, dtype=object)
+                lookup[:-1] = categories
+                # An explicit object dtype, so pandas does not infer a string dtype
+                values = pd.Series(lookup[array], dtype=object)
+                if dtype is not None and dtype != 'object':
+                    values = values.astype(dtype)
+            else:
+                values = pd.Categorical.from_codes(array, categories=categories, validate=False)
+        else:
+            # A plain ndarray view, still backed by the memory map
+            values = np.asarray(array)
+            if decode and dtype is not None and dtype != str(array.dtype):
+                values = pd.Series(array).astype(dtype)
+        names.append(column['name'])
+        data.append(values)
+    # Positional keys, so that columns with the same name are all kept
+    table = pd.DataFrame(dict(enumerate(data)), index=pd.RangeIndex(meta['num_rows']), copy=False)
+    table.columns = names
+    return table
+
+
+def export_clean_data(clean_data_dir='clean_data', output_dir='clean_data_columnar', tables=CLEAN_TABLES):
+    """
+    Exports the clean CSV tables to the columnar format.
+
+    Args:
+        clean_data_dir (str): Directory with the clean CSV files.
+        output_dir (str): Directory to write one sub-directory per table to.
+        tables (list): Table names (CSV file names without extension).
+    """
+    for table in tables:
+        csv_path = os.path.join(clean_data_dir, f'{table}.csv')
+        try:
+            df = pd.read_csv(csv_path)
+        except FileNotFoundError:
+            print(f"Error: File not found at {csv_path}")
+            continue
+        table_dir = os.path.join(output_dir, table)
+        export_table(df, table_dir)
+        csv_size = os.path.getsize(csv_path)
+        columnar_size = sum(os.path.getsize(os.path.join(table_dir, f)) for f in os.listdir(table_dir))
+        print(f"Exported {table}: {len(df)} rows, {csv_size} bytes CSV -> {columnar_size} bytes columnar")
+
+
+def load_clean_table(table, columnar_dir='clean_data_columnar', **kwargs):
+    """
+    Loads one clean table from the columnar export.
+
+    Args:
+        table (str): Table name, e.g. 'routes' or 'airports'.
+        columnar_dir (str): Directory written by export_clean_data.
+        **kwargs: Passed to load_table.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
+    return load_table(os.path.join(columnar_dir, table), **kwargs)
+
+
+if __name__ == "__main__":
+    export_clean_data()
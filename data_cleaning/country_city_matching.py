@@ -1,12 +1,17 @@
 import os
 
 import pandas as pd
-from rapidfuzz import fuzz, process
+
+from fuzzy_matcher import match_names
+from instrumentation import count_rejected, count_rows, record_failure, run_script
 
 
 def extract_country_city_from_airports_csv():
     """
     Extracts unique 'Country' and 'City' columns from the airports.csv file.
+
+    Returns:
+        bool: True if both lists were saved, False if the extraction failed.
     """
     script_dir = os.path.dirname(__file__)
     airports_csv_path = os.path.abspath(
@@ -40,13 +45,15 @@ def extract_country_city_from_airports_csv():
         cities_output_path = os.path.join(clean_data_dir, "unique_cities.csv")
         cities_df.to_csv(cities_output_path, index=False)
         print(f"Unique cities saved to: {cities_output_path}")
+        return True
 
     except FileNotFoundError:
-        print(f"Error: The file {airports_csv_path} was not found.")
+        record_failure(f"Error: The file {airports_csv_path} was not found.")
     except KeyError as e:
-        print(f"Error: Missing expected column in CSV: {e}")
+        record_failure(f"Error: Missing expected column in CSV: {e}")
     except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+        record_failure(f"An unexpected error occurred: {e}")
+    return False
 
 
 '''
@@ -197,7 +204,7 @@ def map_countries_to_gdp_fuzzywuzzy():
     try:
         # Load the list of unique countries to match against (from unique_countries.csv)
         if not os.path.exists(unique_countries_csv_path):
-            print(
+            record_failure(
                 f"Error: {unique_countries_csv_path} not found. Please run extract_country_city_from_airports_csv first."
             )
             return
@@ -212,18 +219,22 @@ def map_countries_to_gdp_fuzzywuzzy():
             )
             return
 
-        # Read country_gdp.csv in chunks and perform fuzzy matching
+        # Read country_gdp.csv in chunks, then score all names in one batched call
+        gdp_countries = []
         for chunk in pd.read_csv(country_gdp_csv_path, chunksize=CHUNK_SIZE):
-            for country_in_csv in chunk["Country Name"].dropna().unique():
-                if country_in_csv not in country_mapping:
-                    best_match = process.extractOne(
-                        country_in_csv, unique_countries_list
-                    )
-                    if best_match and best_match[1] >= 90:
-                        country_mapping[country_in_csv] = best_match[0]
-                        successfully_mapped_unique_countries_gdp.add(best_match[0])
-                    else:
-                        country_mapping[country_in_csv] = None
+            gdp_countries.extend(chunk["Country Name"].dropna().unique())
+
+        # Few enough countries to compare every pair, so no blocking
+        matches = match_names(
+            gdp_countries, unique_countries_list, score_cutoff=90, blocking=False
+        )
+        for country_in_csv, (best_match, _score) in matches.items():
+            country_mapping[country_in_csv] = best_match
+            if best_match is not None:
+                successfully_mapped_unique_countries_gdp.add(best_match)
+        mapped_count = sum(match is not None for match in country_mapping.values())
+        count_rows(rows_in=len(country_mapping), rows_out=mapped_count)
+        count_rejected('no_match_above_cutoff', len(country_mapping) - mapped_count)
 
         # Save successful mappings to CSV
         if country_mapping:
@@ -279,16 +290,89 @@ def map_countries_to_gdp_fuzzywuzzy():
             )
 
     except FileNotFoundError:
-        print(
+        record_failure(
             f"Error: The file {country_gdp_csv_path} or {unique_countries_csv_path} was not found."
         )
     except KeyError as e:
-        print(f"Error: Missing expected column in CSV: {e}")
+        record_failure(f"Error: Missing expected column in CSV: {e}")
     except Exception as e:
-        print(f"An unexpected error occurred during fuzzy mapping: {e}")
+        record_failure(f"An unexpected error occurred during fuzzy mapping: {e}")
+
+
+def map_cities_fuzzy(gazetteer_csv_path=None, city_column="city"):
+    """
+    Maps the unique airport cities from unique_cities.csv to the city names of a
+    gazetteer (e.g. worldcities.csv) using the batched, blocked matcher.
+    Accepted and rejected names are kept in city_match_cache.csv, so a re-run
+    only scores cities that were not seen before.
+    """
+    script_dir = os.path.dirname(__file__)
+    if gazetteer_csv_path is None:
+        gazetteer_csv_path = os.path.abspath(
+            os.path.join(script_dir, "..", "source_data", "worldcities.csv")
+        )
+    clean_data_dir = os.path.abspath(
+        os.path.join(script_dir, "..", "clean_data_mappings")
+    )
+    unique_cities_csv_path = os.path.join(clean_data_dir, "unique_cities.csv")
+    cache_path = os.path.join(clean_data_dir, "city_match_cache.csv")
+
+    print("\n--- Performing Fuzzy City Mapping ---")
+    try:
+        if not os.path.exists(unique_cities_csv_path):
+            record_failure(
+                f"Error: {unique_cities_csv_path} not found. Please run extract_country_city_from_airports_csv first."
+            )
+            return
+        unique_cities_list = (
+            pd.read_csv(unique_cities_csv_path)["Unique_Cities"].dropna().tolist()
+        )
+        gazetteer_cities = (
+            pd.read_csv(gazetteer_csv_path, usecols=[city_column])[city_column]
+            .dropna()
+            .unique()
+            .tolist()
+        )
+
+        matches = match_names(
+            unique_cities_list, gazetteer_cities, score_cutoff=90, cache_path=cache_path
+        )
+        successful_mappings = [
+            (city, match) for city, (match, _score) in matches.items() if match is not None
+        ]
+        mapping_df = pd.DataFrame(
+            successful_mappings, columns=["Unique_City", "Mapped_Gazetteer_City"]
+        )
+        count_rows(rows_in=len(unique_cities_list), rows_out=len(mapping_df))
+        count_rejected('no_match_above_cutoff', len(unique_cities_list) - len(mapping_df))
+        mapping_output_path = os.path.join(clean_data_dir, "mapped_cities.csv")
+        mapping_df.to_csv(mapping_output_path, index=False)
+        print(
+            f"Fuzzy city mappings (score >= 90) saved to: {mapping_output_path}. "
+            f"{len(mapping_df)} of {len(unique_cities_list)} cities mapped."
+        )
+
+    except FileNotFoundError:
+        record_failure(
+            f"Error: The file {gazetteer_csv_path} or {unique_cities_csv_path} was not found."
+        )
+    except KeyError as e:
+        record_failure(f"Error: Missing expected column in CSV: {e}")
+    except Exception as e:
+        record_failure(f"An unexpected error occurred during fuzzy mapping: {e}")
+
+
+def run_country_city_matching():
+    """
+    Extracts the unique airport countries and cities and maps the GDP countries
+    to them. The mapping is skipped if the extraction failed, so it never runs on
+    an outdated unique_countries.csv.
+    """
+    if extract_country_city_from_airports_csv():
+        # map_countries_fuzzywuzzy()
+        map_countries_to_gdp_fuzzywuzzy()
+        # map_cities_fuzzy()  # needs a gazetteer such as source_data/worldcities.csv
 
 
 if __name__ == "__main__":
-    extract_country_city_from_airports_csv()
-    # map_countries_fuzzywuzzy()
-    map_countries_to_gdp_fuzzywuzzy()
+    run_script('country_city_matching', run_country_city_matching)
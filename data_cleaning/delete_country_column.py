@@ -1,19 +1,33 @@
 import pandas as pd
 
-def delete_index_column(file_path):
+from instrumentation import count_rows, record_failure, run_script
+
+def delete_index_column(file_path, output_file_path=None):
+    """
+    Removes the 'index' column from a CSV file.
+
+    Args:
+        file_path (str): Path to the input CSV file.
+        output_file_path (str): Path to write the result to. Defaults to overwriting file_path.
+    """
+    if output_file_path is None:
+        output_file_path = file_path
     try:
         df = pd.read_csv(file_path)
+        count_rows(rows_in=len(df), rows_out=len(df))
         if 'index' in df.columns:
             df = df.drop(columns=['index'])
-            df.to_csv(file_path, index=False)
+            df.to_csv(output_file_path, index=False)
             print(f"Successfully deleted 'index' column from {file_path}")
         else:
+            if output_file_path != file_path:
+                df.to_csv(output_file_path, index=False)
             print(f"'index' column not found in {file_path}")
     except FileNotFoundError:
-        print(f"Error: File not found at {file_path}")
+        record_failure(f"Error: File not found at {file_path}")
     except Exception as e:
-        print(f"An error occurred: {e}")
+        record_failure(f"An error occurred: {e}")
 
 if __name__ == "__main__":
     file_path = "clean_data/airlines.csv"
-    delete_index_column(file_path)
+    run_script('delete_index_column', delete_index_column, file_path)
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+# Tokens that are too common to be useful as blocking keys
+STOP_TOKENS = {"the", "of", "and", "de", "la", "le", "el", "del", "da", "do", "dos", "das", "st", "saint"}
+
+CACHE_COLUMNS = ["Query", "Match", "Score", "Choices_Hash"]
+
+
+def blocking_keys(name):
+    """
+    Returns the blocking keys of a name: the first three letters of each of its
+    words (ignoring very common words). Only names sharing at least one key are
+    compared with each other.
+    """
+    tokens = re.findall(r"\w+", name.lower())
+    keys = {token[:3] for token in tokens if token not in STOP_TOKENS}
+    if not keys and tokens:
+        keys = {token[:3] for token in tokens}
+    return keys
+
+
+def hash_choices(choices):
+    """Returns a hash identifying a list of candidate names."""
+    digest = hashlib.sha256()
+    for choice in choices:
+        digest.update(choice.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def load_match_cache(cache_path):
+    """
+    Loads a mapping cache written by save_match_cache.
+
+    Args:
+        cache_path (str): Path to the cache CSV file.
+
+    Returns:
+        pd.DataFrame: Cached query -> match rows (empty if there is no cache yet).
+    """
+    if not cache_path or not os.path.exists(cache_path):
+        return pd.DataFrame(columns=CACHE_COLUMNS)
+    return pd.read_csv(
+        cache_path,
+        dtype={"Query": str, "Match": str, "Choices_Hash": str},
+        keep_default_na=False,
+        float_precision="round_trip",
+    )
+
+
+def save_match_cache(cache_path, results, choices_hash, previous_cache_df=None):
+    """
+    Writes match results to the mapping cache, keeping the previously cached
+    entries of names that are not part of the results.
+
+    Args:
+        cache_path (str): Path to the cache CSV file.
+        results (dict): Query -> (match or None, score).
+        choices_hash (str): Hash of the candidate list the results were scored against.
+        previous_cache_df (pd.DataFrame): Cache contents loaded before matching.
+    """
+    cache_df = pd.DataFrame(
+        [
+            (query, match if match is not None else "", score, choices_hash)
+            for query, (match, score) in results.items()
+        ],
+        columns=CACHE_COLUMNS,
+    )
+    if previous_cache_df is not None and not previous_cache_df.empty:
+        kept_df = previous_cache_df[~previous_cache_df["Query"].isin(cache_df["Query"])]
+        cache_df = pd.concat([kept_df, cache_df], ignore_index=True)
+    cache_df.to_csv(cache_path, index=False)
+
+
+def score_best_matches(queries, choices, scorer=fuzz.WRatio, blocking=True, workers=-1):
+    """
+    Finds the best scoring choice for every query with batched score-matrix calls.
+
+    Without blocking this is a single cdist call over all queries x choices. With
+    blocking, queries and choices are grouped by blocking_keys() and one cdist call
+    is made per shared key, so the work grows with the block sizes instead of
+    len(queries) * len(choices). Ties are resolved to the earlier choice, like
+    process.extractOne.
+
+    Args:
+        queries (list): Names to match.
+        choices (list): Candidate names.
+        scorer (callable): rapidfuzz scorer.
+        blocking (bool): Only compare names that share a blocking key.
+        workers (int): Number of threads for cdist (-1 uses all cores).
+
+    Returns:
+        tuple: (best choice index per query, -1 where nothing was compared;
+                best score per query)
+    """
+    best_index = np.full(len(queries), -1, dtype=np.int64)
+    best_score = np.full(len(queries), -1.0)
+    if not queries or not choices:
+        return best_index, best_score
+
+    if not blocking:
+        scores = process.cdist(queries, choices, scorer=scorer, dtype=np.float64, workers=workers)
+        best_index = scores.argmax(axis=1)
+        best_score = scores[np.arange(len(queries)), best_index]
+        return best_index, best_score
+
+    choice_blocks = defaultdict(list)
+    for choice_idx, choice in enumerate(choices):
+        for key in blocking_keys(choice):
+            choice_blocks[key].append(choice_idx)
+
+    query_blocks = defaultdict(list)
+    for query_idx, query in enumerate(queries):
+        for key in blocking_keys(query):
+            if key in choice_blocks:
+                query_blocks[key].append(query_idx)
+
+    for key, query_idxs in query_blocks.items():
+        choice_idxs = np.asarray(choice_blocks[key])
+        query_idxs = np.asarray(query_idxs)
+        scores = process.cdist(
+            [queries[i] for i in query_idxs],
+            [choices[i] for i in choice_idxs],
+            scorer=scorer,
+            dtype=np.float64,
+            workers=workers,
+        )
+        block_best = scores.argmax(axis=1)
+        block_score = scores[np.arange(len(query_idxs)), block_best]
+        block_index = choice_idxs[block_best]
+
+        better = (block_score > best_score[query_idxs]) | (
+            (block_score == best_score[query_idxs]) & (block_index < best_index[query_idxs])
+        )
+        best_score[query_idxs[better]] = block_score[better]
+        best_index[query_idxs[better]] = block_index[better]
+
+    return best_index, best_score
+
+
+def match_names(queries, choices, score_cutoff=90, blocking=True, cache_path=None, scorer=fuzz.WRatio, workers=-1):
+    """
+    Matches every query name to its most similar choice. Names already present in
+    the mapping cache are not scored again: accepted matches are reused as long as
+    the matched name is still a choice, rejections as long as the choices did not change.
+
+    Args:
+        queries (iterable): Names to match (duplicates are matched once).
+        choices (iterable): Candidate names.
+        score_cutoff (float): Minimum score for a match to be accepted.
+        blocking (bool): Only compare names that share a blocking key.
+        cache_path (str): Optional path to the mapping cache CSV file.
+        scorer (callable): rapidfuzz scorer.
+        workers (int): Number of threads for cdist (-1 uses all cores).
+
+    Returns:
+        dict: Query -> (matched choice or None, score).
+    """
+    queries = list(dict.fromkeys(queries))
+    choices = list(dict.fromkeys(choices))
+    choices_set = set(choices)
+    choices_hash = hash_choices(choices)
+
+    results = {}
+    cache_df = load_match_cache(cache_path)
+    queries_set = set(queries)
+    for row in cache_df.itertuples(index=False):
+        if row.Query not in queries_set:
+            continue
+        if row.Match and row.Match in choices_set:
+            results[row.Query] = (row.Match, float(row.Score))
+        elif not row.Match and row.Choices_Hash == choices_hash:
+            results[row.Query] = (None, float(row.Score))
+
+    to_score = [query for query in queries if query not in results]
+    if to_score:
+        print(f"Scoring {len(to_score)} names against {len(choices)} candidates ({len(results)} cached)")
+        best_index, best_score = score_best_matches(to_score, choices, scorer=scorer, blocking=blocking, workers=workers)
+        for query, choice_idx, score in zip(to_score, best_index, best_score):
+            if choice_idx >= 0 and score >= score_cutoff:
+                results[query] = (choices[choice_idx], float(score))
+            else:
+                results[query] = (None, float(max(score, 0)))
+
+    if cache_path and to_score:
+        save_match_cache(cache_path, results, choices_hash, cache_df)
+
+    return {query: results[query] for query in queries}
@@ -0,0 +1,274 @@
+import cProfile
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+REPORT_DIR = os.path.join(REPO_DIR, '.run_reports')
+
+# Metrics of the stage that is running in this process. The cleaning scripts
+# report to it through the functions below, which do nothing outside a stage,
+# so the scripts can still be imported and called on their own.
+_current = None
+
+
+class StageMetrics:
+    """
+    Measurements of one stage run: wall and CPU time, peak resident memory,
+    rows read and written, and rows rejected per cleaning rule.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.status = 'running'
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_rss_bytes = None
+        self.rows_in = 0
+        self.rows_out = 0
+        self.rejected = {}
+        self.error = None
+        self.profile = None
+
+    @property
+    def failed(self):
+        return self.status == 'failed'
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'status': self.status,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_rejected': sum(self.rejected.values()),
+            'rejected': dict(self.rejected),
+            'error': self.error,
+        }
+
+
+def count_rows(rows_in=0, rows_out=0):
+    """Adds to the rows read and written by the running stage."""
+    if _current is not None:
+        _current.rows_in += rows_in
+        _current.rows_out += rows_out
+
+
+def count_rejected(rule, count=1):
+    """Adds count rows rejected by a cleaning rule to the running stage."""
+    if _current is not None and count:
+        _current.rejected[rule] = _current.rejected.get(rule, 0) + count
+
+
+def counting(rows):
+    """
+    Generator stage: passes rows through unchanged and counts them as rows read
+    by the running stage.
+
+    Args:
+        rows (iterable): Data rows.
+
+    Yields:
+        The same rows.
+    """
+    if _current is None:
+        yield from rows
+        return
+    metrics = _current
+    for row in rows:
+        metrics.rows_in += 1
+        yield row
+
+
+def record_failure(message):
+    """
+    Prints an error and marks the running stage as failed. Scripts call this
+    where they catch an exception and return, so the run still ends with an
+    error status.
+
+    Args:
+        message (str): The error message.
+    """
+    print(message)
+    if _current is not None:
+        _current.status = 'failed'
+        _current.error = message
+
+
+def _reset_peak_rss():
+    """Resets the kernel's peak RSS counter of this process (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', mode='w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes(reset_worked):
+    if reset_worked:
+        with open('/proc/self/status', mode='r') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    if resource is None:
+        return None
+    # Peak of the whole process so far: KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def measure(name, profile=False):
+    """
+    Measures a stage. While the block runs, count_rows, count_rejected and
+    record_failure report to the returned metrics. An exception marks the
+    stage as failed and is re-raised.
+
+    Args:
+        name (str): Stage name.
+        profile (bool): Also run cProfile; the profiler is kept in metrics.profile.
+
+    Yields:
+        StageMetrics: The metrics, filled in when the block ends.
+    """
+    global _current
+    metrics = StageMetrics(name)
+    previous, _current = _current, metrics
+    reset_worked = _reset_peak_rss()
+    profiler = cProfile.Profile() if profile else None
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics.status = 'failed'
+        metrics.error = metrics.error or f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            metrics.profile = profiler
+        metrics.wall_seconds = time.perf_counter() - wall_start
+        metrics.cpu_seconds = time.process_time() - cpu_start
+        metrics.peak_rss_bytes = _peak_rss_bytes(reset_worked)
+        if metrics.status == 'running':
+            metrics.status = 'ok'
+        _current = previous
+
+
+class RunReport:
+    """
+    Collects the metrics of all stages of a run and writes them as a JSON
+    report, optionally together with a cProfile dump of the slowest stage.
+    """
+
+    def __init__(self, name, profile=False):
+        self.name = name
+        self.profile = profile
+        self.started_at = datetime.now(timezone.utc)
+        self.stages = []
+        self.error = None
+
+    @contextmanager
+    def stage(self, name):
+        """Measures a stage of this run; see measure()."""
+        with measure(name, profile=self.profile) as metrics:
+            self.stages.append(metrics)
+            yield metrics
+
+    def skip(self, name):
+        """Records a stage that was not run because its outputs were cached."""
+        metrics = StageMetrics(name)
+        metrics.status = 'cached'
+        self.stages.append(metrics)
+        return metrics
+
+    @property
+    def failed(self):
+        return self.error is not None or any(metrics.failed for metrics in self.stages)
+
+    def hottest_stage(self):
+        """The stage with the longest wall time, or None if no stage ran."""
+        ran = [metrics for metrics in self.stages if metrics.status != 'cached']
+        return max(ran, key=lambda metrics: metrics.wall_seconds, default=None)
+
+    def to_dict(self):
+        hottest = self.hottest_stage()
+        return {
+            'run': self.name,
+            'status': 'failed' if self.failed else 'ok',
+            'error': self.error,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'argv': sys.argv,
+            'wall_seconds': round(sum(metrics.wall_seconds for metrics in self.stages), 6),
+            'cpu_seconds': round(sum(metrics.cpu_seconds for metrics in self.stages), 6),
+            'hottest_stage': hottest.name if hottest else None,
+            'stages': [metrics.to_dict() for metrics in self.stages],
+        }
+
+    def write(self, report_dir=REPORT_DIR):
+        """
+        Writes the report to <report_dir>/<run>_<timestamp>.json and, if the run
+        was profiled, the profile of the slowest stage next to it as .prof
+        (readable with `python -m pstats`).
+
+        Args:
+            report_dir (str): Directory for the reports.
+
+        Returns:
+            str: Path of the JSON report.
+        """
+        os.makedirs(report_dir, exist_ok=True)
+        base_path = os.path.join(report_dir, f"{self.name}_{self.started_at.strftime('%Y%m%dT%H%M%S')}")
+        report = self.to_dict()
+
+        hottest = self.hottest_stage()
+        if hottest is not None and hottest.profile is not None:
+            profile_path = f"{base_path}_{hottest.name}.prof"
+            hottest.profile.dump_stats(profile_path)
+            report['profile'] = profile_path
+
+        report_path = base_path + '.json'
+        tmp_report_path = report_path + '.tmp'
+        with open(tmp_report_path, mode='w', encoding='utf-8') as outfile:
+            json.dump(report, outfile, indent=2)
+        os.replace(tmp_report_path, report_path)
+        return report_path
+
+
+def run_script(name, function, *args, report_dir=REPORT_DIR):
+    """
+    Entry point for running a single cleaning script: runs function(*args) as
+    one measured stage, writes the run report and exits with status 1 if the
+    stage failed.
+
+    Args:
+        name (str): Stage name.
+        function (callable): The script's function.
+        *args: Arguments for the function.
+        report_dir (str): Directory for the reports.
+    """
+    report = RunReport(name, profile='--profile' in sys.argv)
+    try:
+        with report.stage(name):
+            function(*args)
+    except Exception:
+        traceback.print_exc()
+    report_path = report.write(report_dir)
+    print(f"Run report written to {report_path}")
+    if report.failed:
+        sys.exit(1)
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import count_rejected, count_rows, record_failure, run_script
+from reference_index import CountryIndex
+
+
+def to_canonical_categories(columns, canonical=None, categories=()):
+    """
+    Maps several columns of raw names to one shared categorical dtype. The mapping
+    is applied once per distinct name instead of once per row, so the cost does
+    not grow with the number of rows, and the same works for regions or cities.
+
+    Args:
+        columns (list): Series of raw names, e.g. the 'Country' columns of several tables.
+        canonical (callable): Maps an array of distinct raw names to their
+            canonical names (e.g. CountryIndex.canonical_names). Defaults to
+            keeping the names as they are.
+        categories (iterable): Canonical names that are categories even if no
+            column contains them, e.g. the country names of the GDP data.
+
+    Returns:
+        tuple: (list of categorical Series in the order of columns, the CategoricalDtype)
+    """
+    codes, uniques = pd.factorize(pd.concat(columns, ignore_index=True))
+    uniques = np.asarray(uniques, dtype=object)
+    mapped = np.asarray(canonical(uniques) if canonical is not None else uniques, dtype=object)
+
+    # Missing values are not a category; they stay NaN in the categorical columns
+    names = pd.Index(mapped).append(pd.Index(list(categories), dtype=object)).dropna().unique()
+    dtype = pd.CategoricalDtype(names.sort_values())
+    category_codes = pd.Categorical(mapped, dtype=dtype).codes
+    all_codes = np.where(codes >= 0, category_codes[np.maximum(codes, 0)], -1)
+
+    normalized = []
+    start = 0
+    for column in columns:
+        column_codes = all_codes[start:start + len(column)]
+        normalized.append(pd.Series(pd.Categorical.from_codes(column_codes, dtype=dtype), index=column.index,
+                                    name=column.name))
+        start += len(column)
+    return normalized, dtype
+
+
+def _missing_gdp_rows(countries, gdp_df):
+    """GDP rows with only the 'Country Name' set, one per country."""
+    missing_df = pd.DataFrame({'Country Name': list(countries)})
+    for col in gdp_df.columns:
+        if col != 'Country Name':
+            missing_df[col] = pd.NA
+    return missing_df[gdp_df.columns]
+
+
+def build_country_alignment(airport_countries, airline_countries, gdp_countries):
+    """
+    Counts the airports, airlines and GDP rows of every canonical country.
+
+    Args:
+        airport_countries (pd.Series): Categorical 'Country' of the airports.
+        airline_countries (pd.Series): Categorical 'Country' of the airlines.
+        gdp_countries (pd.Series): Categorical 'Country Name' of the GDP data.
+
+    Returns:
+        pd.DataFrame: One row per category with the columns 'Country', 'Airports',
+        'Airlines', 'GDP rows' and 'Status' ('aligned', 'missing_gdp' or 'no_airports').
+    """
+    alignment_df = pd.DataFrame({
+        'Country': airport_countries.cat.categories,
+        'Airports': airport_countries.value_counts(sort=False).to_numpy(),
+        'Airlines': airline_countries.value_counts(sort=False).to_numpy(),
+        'GDP rows': gdp_countries.value_counts(sort=False).to_numpy(),
+    })
+    has_gdp = alignment_df['GDP rows'] > 0
+    alignment_df['Status'] = np.select(
+        [has_gdp & (alignment_df['Airports'] > 0), ~has_gdp],
+        ['aligned', 'missing_gdp'],
+        default='no_airports',
+    )
+    return alignment_df
+
+
+def normalize_countries(mapping_file_path, airports_file_path, airlines_file_path, gdp_file_path,
+                        airports_output_file_path, airlines_output_file_path, aligned_gdp_output_file_path,
+                        aligned_gdp_airlines_output_file_path, alignment_output_file_path):
+    """
+    Maps the 'Country' columns of the airports and airlines data to the country
+    names used in the GDP data and aligns the GDP data with them, in one pass
+    over the three tables held in memory:
+    - The airports and airlines are written with the GDP country names and
+      without the 'index' column.
+    - The aligned GDP data keeps the GDP rows of countries that have airports and
+      adds empty rows for airport countries that are missing from the GDP data.
+    - The aligned GDP data for airlines additionally has the GDP rows of airline
+      countries without airports, and empty rows for those missing from the GDP data.
+    - The alignment report lists every country with its number of airports,
+      airlines and GDP rows.
+
+    Args:
+        mapping_file_path (str): Path to the mapped GDP countries CSV file.
+        airports_file_path (str): Path to the source airports CSV file.
+        airlines_file_path (str): Path to the source airlines CSV file.
+        gdp_file_path (str): Path to the source country GDP CSV file.
+        airports_output_file_path (str): Path to the output airports CSV file.
+        airlines_output_file_path (str): Path to the output airlines CSV file.
+        aligned_gdp_output_file_path (str): Path to the output aligned GDP CSV file.
+        aligned_gdp_airlines_output_file_path (str): Path to the output GDP CSV file for the airlines.
+        alignment_output_file_path (str): Path to the output country alignment report CSV file.
+
+    Returns:
+        pd.DataFrame: The country alignment report, or None if an input file is missing.
+    """
+    try:
+        countries = CountryIndex.cached(mapping_file_path)
+        airports_df = pd.read_csv(airports_file_path)
+        airlines_df = pd.read_csv(airlines_file_path)
+        gdp_df = pd.read_csv(gdp_file_path)
+    except FileNotFoundError as e:
+        record_failure(f"Error: File not found: {e.filename}")
+        return None
+
+    # The GDP names are canonical as they are; every other name is mapped to them
+    (airport_countries, airline_countries), _ = to_canonical_categories(
+        [airports_df['Country'], airlines_df['Country']], countries.canonical_names, gdp_df['Country Name'].dropna())
+    (gdp_countries,), _ = to_canonical_categories([gdp_df['Country Name']], categories=airport_countries.cat.categories)
+    alignment_df = build_country_alignment(airport_countries, airline_countries, gdp_countries)
+
+    airports_df['Country'] = airport_countries
+    airlines_df['Country'] = airline_countries
+    airports_df.drop(columns=['index'], errors='ignore').to_csv(airports_output_file_path, index=False)
+    airlines_df.drop(columns=['index'], errors='ignore').to_csv(airlines_output_file_path, index=False)
+
+    has_airports = alignment_df['Airports'] > 0
+    has_gdp = alignment_df['GDP rows'] > 0
+    gdp_with_airports = gdp_countries.isin(alignment_df.loc[has_airports, 'Country'])
+    aligned_gdp_df = pd.concat(
+        [gdp_df[gdp_with_airports], _missing_gdp_rows(alignment_df.loc[has_airports & ~has_gdp, 'Country'], gdp_df)],
+        ignore_index=True,
+    )
+    airline_only = (alignment_df['Airlines'] > 0) & ~has_airports
+    gdp_of_airline_only = gdp_countries.isin(alignment_df.loc[airline_only & has_gdp, 'Country'])
+    aligned_gdp_airlines_df = pd.concat(
+        [aligned_gdp_df, gdp_df[gdp_of_airline_only],
+         _missing_gdp_rows(alignment_df.loc[airline_only & ~has_gdp, 'Country'], gdp_df)],
+        ignore_index=True,
+    )
+    aligned_gdp_df.to_csv(aligned_gdp_output_file_path, index=False)
+    aligned_gdp_airlines_df.to_csv(aligned_gdp_airlines_output_file_path, index=False)
+    alignment_df.to_csv(alignment_output_file_path, index=False)
+
+    # Source rows only: the empty GDP rows added for missing countries are not
+    # counted, and a GDP row written to both aligned files counts once, so that
+    # rows in minus rejected rows equals rows out
+    gdp_kept = gdp_with_airports | gdp_of_airline_only
+    count_rows(rows_in=len(airports_df) + len(airlines_df) + len(gdp_df),
+               rows_out=len(airports_df) + len(airlines_df) + int(gdp_kept.sum()))
+    count_rejected('country_without_airports_or_airlines', int((~gdp_kept).sum()))
+
+    missing = alignment_df['Status'] == 'missing_gdp'
+    print(f"Countries normalized: {int(has_gdp.sum())} with GDP data, {int(missing.sum())} without "
+          f"({int((missing & has_airports).sum())} of them with airports). Report saved to {alignment_output_file_path}")
+    return alignment_df
+
+
+if __name__ == "__main__":
+    run_script('normalize_countries', normalize_countries, 'clean_data_mappings/mapped_gdp_countries.csv',
+               'source_data/airports.csv', 'source_data/airlines.csv', 'source_data/country_gdp.csv',
+               'clean_data/airports.csv', 'clean_data/airlines.csv', 'clean_data/aligned_gdp.csv',
+               'clean_data/aligned_gdp_airlines.csv', 'clean_data_mappings/country_alignment.csv')
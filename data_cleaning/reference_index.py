@@ -0,0 +1,270 @@
+import hashlib
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+SNAPSHOT_DIR = os.path.join(REPO_DIR, '.reference_cache')
+
+# Part of every snapshot name, so a change of the layout never loads an old file
+SNAPSHOT_VERSION = 1
+
+
+def _text(values):
+    """Values as a fixed-width unicode array, with missing values as ''."""
+    return np.asarray(pd.Series(values, dtype=object).fillna('').astype(str), dtype=str)
+
+
+class ReferenceIndex:
+    """
+    Reference table held in NumPy arrays, one per column, with rows sorted by
+    integer ID. Lookups by ID are binary searches over the ID array; lookups by
+    a code or name go through a sorted array of the distinct keys. Everything is
+    plain arrays, so an index is saved to and loaded from a binary snapshot
+    without building any Python objects per row, and forked worker processes
+    share the arrays instead of rebuilding dicts.
+
+    Subclasses set ID_COLUMN (the CSV column with the ID, or None to number the
+    rows), COLUMNS (CSV column -> attribute name) and KEYS (attributes that
+    support lookups).
+    """
+
+    KIND = None
+    ID_COLUMN = None
+    COLUMNS = {}
+    FLOAT_COLUMNS = ()
+    KEYS = ()
+    Record = None
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.ids = arrays['id']
+        self._key_sets = {}
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Builds the index from a DataFrame with the CSV's columns. For a key that
+        occurs more than once, lookups return the last row's ID, like a dict built
+        row by row.
+        """
+        if cls.ID_COLUMN is None:
+            ids = np.arange(len(df), dtype=np.int64)
+        else:
+            ids = pd.to_numeric(df[cls.ID_COLUMN], errors='coerce').to_numpy()
+        valid = ~np.isnan(ids.astype(np.float64))
+        order = np.flatnonzero(valid)[np.argsort(ids[valid], kind='stable')]
+
+        arrays = {'id': ids[order].astype(np.int64)}
+        for column, name in cls.COLUMNS.items():
+            if name in cls.FLOAT_COLUMNS:
+                arrays[name] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)[order]
+            else:
+                arrays[name] = _text(df[column])[order]
+
+        for key in cls.KEYS:
+            keys = pd.DataFrame({'key': _text(df[cls._column_of(key)])[valid], 'id': ids[valid].astype(np.int64)})
+            keys = keys[keys['key'] != ''].drop_duplicates('key', keep='last').sort_values('key')
+            arrays[f'{key}_keys'] = keys['key'].to_numpy(dtype=str)
+            arrays[f'{key}_ids'] = keys['id'].to_numpy(dtype=np.int64)
+        return cls(arrays)
+
+    @classmethod
+    def _column_of(cls, attribute):
+        return next(column for column, name in cls.COLUMNS.items() if name == attribute)
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """Builds the index by reading a reference CSV file."""
+        return cls.from_frame(pd.read_csv(csv_path, dtype=str, keep_default_na=False))
+
+    def save(self, snapshot_path):
+        """Writes the arrays to an uncompressed .npz snapshot."""
+        tmp_snapshot_path = snapshot_path + '.tmp.npz'
+        np.savez(tmp_snapshot_path, **self.arrays)
+        os.replace(tmp_snapshot_path, snapshot_path)
+
+    @classmethod
+    def load(cls, snapshot_path):
+        """Loads an index from a snapshot written by save()."""
+        with np.load(snapshot_path, allow_pickle=False) as snapshot:
+            return cls({name: snapshot[name] for name in snapshot.files})
+
+    @classmethod
+    def cached(cls, csv_path, snapshot_dir=SNAPSHOT_DIR):
+        """
+        Loads the index of a reference CSV from its snapshot, building and saving
+        the snapshot first if the CSV has none yet. Snapshots are named by the
+        SHA-256 of the CSV contents, so an edited file never loads a stale one.
+
+        Args:
+            csv_path (str): Path to the reference CSV file.
+            snapshot_dir (str): Directory with the snapshots.
+
+        Returns:
+            ReferenceIndex: The index.
+        """
+        digest = hashlib.sha256()
+        with open(csv_path, mode='rb') as infile:
+            for block in iter(lambda: infile.read(1 << 20), b''):
+                digest.update(block)
+        snapshot_path = os.path.join(snapshot_dir, f'{cls.KIND}-v{SNAPSHOT_VERSION}-{digest.hexdigest()[:32]}.npz')
+        if os.path.exists(snapshot_path):
+            return cls.load(snapshot_path)
+        index = cls.from_csv(csv_path)
+        os.makedirs(snapshot_dir, exist_ok=True)
+        index.save(snapshot_path)
+        return index
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self, ids):
+        """
+        Row positions of IDs, -1 for IDs that are not in the index.
+
+        Args:
+            ids: Integer IDs, or strings such as the ID columns of the routes;
+                values that are not numbers ('\\N') are not found.
+
+        Returns:
+            np.ndarray: int64 positions.
+        """
+        values = pd.to_numeric(pd.Series(np.atleast_1d(ids)), errors='coerce').to_numpy(dtype=np.float64)
+        known = ~np.isnan(values) & (values == np.round(values))
+        wanted = np.where(known, values, 0).astype(np.int64)
+        found = np.minimum(np.searchsorted(self.ids, wanted), max(len(self.ids) - 1, 0))
+        hit = known & (len(self.ids) > 0)
+        hit[hit] = self.ids[found[hit]] == wanted[hit]
+        return np.where(hit, found, -1)
+
+    def contains(self, ids):
+        """Whether each ID is in the index (vectorized)."""
+        return self.positions(ids) >= 0
+
+    def __contains__(self, reference_id):
+        return bool(self.contains([reference_id])[0])
+
+    def lookup(self, key, values):
+        """
+        IDs by code or name (vectorized).
+
+        Args:
+            key (str): One of KEYS.
+            values: Codes or names.
+
+        Returns:
+            np.ndarray: int64 IDs, -1 where the value is unknown.
+        """
+        keys, key_ids = self.arrays[f'{key}_keys'], self.arrays[f'{key}_ids']
+        values = _text(np.atleast_1d(values))
+        if len(keys) == 0:
+            return np.full(len(values), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(keys, values), len(keys) - 1)
+        hit = (keys[found] == values) & (values != '')
+        return np.where(hit, key_ids[found], -1)
+
+    def get(self, key, value):
+        """ID for one code or name, or None."""
+        reference_id = int(self.lookup(key, [value])[0])
+        return None if reference_id < 0 else reference_id
+
+    def record(self, reference_id):
+        """
+        The row of an ID as a Record named tuple.
+
+        Raises:
+            KeyError: If the ID is not in the index.
+        """
+        position = int(self.positions([reference_id])[0])
+        if position < 0:
+            raise KeyError(f"Unknown {self.KIND} ID {reference_id!r}")
+        return self.Record(int(self.ids[position]), *(self.arrays[name][position].item()
+                                                      for name in self.COLUMNS.values()))
+
+    def key_set(self, key='id'):
+        """
+        The IDs (as strings) or the keys of one lookup as a frozenset, for the
+        row-by-row stages where a set test per value is faster than a NumPy call.
+        Built once per index from the arrays.
+        """
+        if key not in self._key_sets:
+            values = self.ids.astype(str) if key == 'id' else self.arrays[f'{key}_keys']
+            self._key_sets[key] = frozenset(values.tolist())
+        return self._key_sets[key]
+
+    def key_to_id(self, key):
+        """dict from one lookup's keys to ID strings, for the row-by-row stages."""
+        return dict(zip(self.arrays[f'{key}_keys'].tolist(), self.arrays[f'{key}_ids'].astype(str).tolist()))
+
+
+class AirportIndex(ReferenceIndex):
+    KIND = 'airports'
+    ID_COLUMN = 'Airport ID'
+    COLUMNS = {'Name': 'name', 'City': 'city', 'Country': 'country', 'IATA': 'iata', 'ICAO': 'icao',
+               'Latitude': 'latitude', 'Longitude': 'longitude'}
+    FLOAT_COLUMNS = ('latitude', 'longitude')
+    KEYS = ('name', 'iata', 'icao')
+    Record = namedtuple('Airport', ['id', *COLUMNS.values()])
+
+
+class AirlineIndex(ReferenceIndex):
+    KIND = 'airlines'
+    ID_COLUMN = 'Airline ID'
+    COLUMNS = {'Name': 'name', 'IATA': 'iata', 'ICAO': 'icao', 'Callsign': 'callsign', 'Active': 'active'}
+    KEYS = ('name', 'iata', 'icao')
+    Record = namedtuple('Airline', ['id', *COLUMNS.values()])
+
+
+class EquipmentIndex(ReferenceIndex):
+    """Aircraft types; they have no ID in the data, so the rows are numbered."""
+
+    KIND = 'equipment'
+    COLUMNS = {'Name': 'name', 'IATA': 'iata', 'ICAO': 'icao'}
+    KEYS = ('name', 'iata', 'icao')
+    Record = namedtuple('Equipment', ['id', *COLUMNS.values()])
+
+    def contains_codes(self, codes):
+        """Whether each IATA aircraft type code is known (vectorized)."""
+        return self.lookup('iata', codes) >= 0
+
+
+class CountryIndex(ReferenceIndex):
+    """
+    The GDP country names, numbered in file order, together with the mapping
+    from the country names of the aviation data to them
+    (clean_data_mappings/mapped_gdp_countries.csv).
+    """
+
+    KIND = 'countries'
+    COLUMNS = {'Original_Country_in_GDP': 'name'}
+    KEYS = ('name', 'alias')
+    Record = namedtuple('Country', ['id', 'name'])
+
+    @classmethod
+    def from_frame(cls, df):
+        # Every country can be looked up by its GDP name and by its aviation data name
+        return super().from_frame(df.assign(_alias=df['Mapped_Unique_Country']))
+
+    @classmethod
+    def _column_of(cls, attribute):
+        return '_alias' if attribute == 'alias' else super()._column_of(attribute)
+
+    def canonical_names(self, names):
+        """
+        Maps country names of the aviation data to the GDP names; names without a
+        mapping are returned unchanged (vectorized).
+
+        Args:
+            names: Country names.
+
+        Returns:
+            np.ndarray: The GDP names, as objects.
+        """
+        names = pd.Series(np.atleast_1d(names), dtype=object)
+        positions = self.lookup('alias', names.fillna(''))
+        mapped = self.arrays['name'][np.maximum(positions, 0)].astype(object)
+        return np.where(positions >= 0, mapped, names.to_numpy())
@@ -1,35 +1,52 @@
 import pandas as pd
 
-file_path = "clean_data/airplanes.csv"
-
-try:
-    df = pd.read_csv(file_path)
-
-    # Identify duplicates in 'IATA' and 'ICAO' columns
-    # For IATA, consider non-empty strings as potential duplicates
-    iata_duplicates = df[
-        df["IATA"].duplicated(keep=False) & (df["IATA"].notna()) & (df["IATA"] != "")
-    ]
-    # For ICAO, consider non-empty strings as potential duplicates
-    icao_duplicates = df[
-        df["ICAO"].duplicated(keep=False) & (df["ICAO"].notna()) & (df["ICAO"] != "")
-    ]
-
-    # Replace duplicate IATA values with None (which will be written as empty string in CSV)
-    for iata_val in iata_duplicates["IATA"].unique():
-        if iata_val:  # Ensure it's not an empty string or NaN
-            df.loc[df["IATA"] == iata_val, "IATA"] = None
-
-    # Replace duplicate ICAO values with None (which will be written as empty string in CSV)
-    for icao_val in icao_duplicates["ICAO"].unique():
-        if icao_val:  # Ensure it's not an empty string or NaN
-            df.loc[df["ICAO"] == icao_val, "ICAO"] = None
-
-    # Save the modified DataFrame back to the CSV file
-    df.to_csv(file_path, index=False)
-    print(f"Successfully processed and updated {file_path}")
-
-except FileNotFoundError:
-    print(f"Error: The file {file_path} was not found.")
-except Exception as e:
-    print(f"An error occurred: {e}")
+from instrumentation import count_rows, record_failure, run_script
+
+
+def remove_duplicate_codes(file_path, output_file_path=None):
+    """
+    Replaces IATA and ICAO codes that appear on more than one row with empty values.
+
+    Args:
+        file_path (str): Path to the airplanes CSV file.
+        output_file_path (str): Path to write the result to. Defaults to overwriting file_path.
+    """
+    if output_file_path is None:
+        output_file_path = file_path
+
+    try:
+        df = pd.read_csv(file_path)
+
+        # Identify duplicates in 'IATA' and 'ICAO' columns
+        # For IATA, consider non-empty strings as potential duplicates
+        iata_duplicates = df[
+            df["IATA"].duplicated(keep=False) & (df["IATA"].notna()) & (df["IATA"] != "")
+        ]
+        # For ICAO, consider non-empty strings as potential duplicates
+        icao_duplicates = df[
+            df["ICAO"].duplicated(keep=False) & (df["ICAO"].notna()) & (df["ICAO"] != "")
+        ]
+
+        # Replace duplicate IATA values with None (which will be written as empty string in CSV)
+        for iata_val in iata_duplicates["IATA"].unique():
+            if iata_val:  # Ensure it's not an empty string or NaN
+                df.loc[df["IATA"] == iata_val, "IATA"] = None
+
+        # Replace duplicate ICAO values with None (which will be written as empty string in CSV)
+        for icao_val in icao_duplicates["ICAO"].unique():
+            if icao_val:  # Ensure it's not an empty string or NaN
+                df.loc[df["ICAO"] == icao_val, "ICAO"] = None
+
+        # Save the modified DataFrame back to the CSV file
+        df.to_csv(output_file_path, index=False)
+        count_rows(rows_in=len(df), rows_out=len(df))
+        print(f"Successfully processed and updated {output_file_path}")
+
+    except FileNotFoundError:
+        record_failure(f"Error: The file {file_path} was not found.")
+    except Exception as e:
+        record_failure(f"An error occurred: {e}")
+
+
+if __name__ == "__main__":
+    run_script('remove_duplicates', remove_duplicate_codes, "clean_data/airplanes.csv")
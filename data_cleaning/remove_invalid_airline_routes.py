@@ -1,5 +1,29 @@
 import csv
 
+from instrumentation import count_rejected, count_rows, counting, record_failure, run_script
+
+# Assuming 'Airline ID' is at index 2
+AIRLINE_ID_IDX = 2
+
+
+def drop_unknown_airline_rows(rows):
+    """
+    Generator stage: skips rows where the 'Airline ID' column contains '\\N'.
+
+    Args:
+        rows (iterable): Routes data rows (without header).
+
+    Yields:
+        list: The rows that are kept.
+    """
+    for row in rows:
+        if len(row) > AIRLINE_ID_IDX and row[AIRLINE_ID_IDX] == '\\N':
+            # Skip this row if 'Airline ID' is '\N'
+            count_rejected('unknown_airline')
+            continue
+        yield row
+
+
 def remove_invalid_airline_routes(input_routes_file_path, output_routes_file_path):
     """
     Removes rows from the routes data where the 'Airline ID' column contains '\\N'.
@@ -15,32 +39,25 @@ def remove_invalid_airline_routes(input_routes_file_path, output_routes_file_pat
             reader = csv.reader(infile)
             header = next(reader)  # Read header
             cleaned_rows.append(header)  # Keep the header
-
-            # Assuming 'Airline ID' is at index 2
-            airline_id_idx = 2
-            
-            for row in reader:
-                if len(row) > airline_id_idx and row[airline_id_idx] == '\\N':
-                    # Skip this row if 'Airline ID' is '\N'
-                    continue
-                cleaned_rows.append(row)
+            cleaned_rows.extend(drop_unknown_airline_rows(counting(reader)))
 
     except FileNotFoundError:
-        print(f"Error: Input routes file not found at {input_routes_file_path}")
+        record_failure(f"Error: Input routes file not found at {input_routes_file_path}")
         return
     except Exception as e:
-        print(f"Error reading routes file: {e}")
+        record_failure(f"Error reading routes file: {e}")
         return
 
     try:
         with open(output_routes_file_path, mode='w', newline='', encoding='utf-8') as outfile:
             writer = csv.writer(outfile)
             writer.writerows(cleaned_rows)
+        count_rows(rows_out=len(cleaned_rows) - 1)
         print(f"Cleaned data written to {output_routes_file_path}. {len(cleaned_rows) - 1} rows remaining.")
     except Exception as e:
-        print(f"Error writing cleaned data to file: {e}")
+        record_failure(f"Error writing cleaned data to file: {e}")
 
 if __name__ == "__main__":
     input_csv = 'clean_data/routes.csv'
     output_csv = 'clean_data/routes_no_invalid_airlines.csv'
-    remove_invalid_airline_routes(input_csv, output_csv)
+    run_script('remove_invalid_airline_routes', remove_invalid_airline_routes, input_csv, output_csv)
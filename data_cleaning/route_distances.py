@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from instrumentation import count_rows, record_failure, run_script
+from routes_columnar import read_csv_as_text, write_csv_like_csv_module
+
+EARTH_RADIUS_KM = 6371.0088
+
+DISTANCE_COLUMN = 'Distance km'
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in kilometres between points given in degrees.
+    Works element-wise on NumPy arrays.
+
+    Args:
+        lat1, lon1: Latitude and longitude of the start points.
+        lat2, lon2: Latitude and longitude of the end points.
+
+    Returns:
+        np.ndarray: Distances in km.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def add_route_distances(routes_file_path, airports_file_path, output_file_path=None):
+    """
+    Adds the great-circle distance between the source and destination airport to
+    every route, computed for all routes at once. All other values are written
+    back exactly as they were read. Running it again recomputes the column.
+
+    Args:
+        routes_file_path (str): Path to the clean routes CSV file.
+        airports_file_path (str): Path to the clean airports CSV file.
+        output_file_path (str): Path to the output CSV file. Defaults to routes_file_path.
+
+    Returns:
+        int: Number of routes without a distance (unknown airport or coordinates),
+        or None if the stage failed.
+    """
+    output_file_path = output_file_path or routes_file_path
+    try:
+        routes_df = read_csv_as_text(routes_file_path)
+        airports_df = pd.read_csv(airports_file_path, usecols=['Airport ID', 'Latitude', 'Longitude'])
+    except FileNotFoundError as e:
+        record_failure(f"Error: File not found: {e.filename}")
+        return None
+    except Exception as e:
+        record_failure(f"Error reading input files: {e}")
+        return None
+
+    coordinates = airports_df.set_index('Airport ID')
+    source_ids = pd.to_numeric(routes_df['Source airport ID'], errors='coerce')
+    destination_ids = pd.to_numeric(routes_df['Destination airport ID'], errors='coerce')
+    source = coordinates.reindex(source_ids)
+    destination = coordinates.reindex(destination_ids)
+    distances = haversine_km(source['Latitude'], source['Longitude'],
+                             destination['Latitude'], destination['Longitude'])
+
+    routes_df[DISTANCE_COLUMN] = pd.Series(distances).map(lambda km: '' if np.isnan(km) else f'{km:.1f}').to_numpy()
+
+    try:
+        write_csv_like_csv_module(routes_df, output_file_path)
+    except Exception as e:
+        record_failure(f"Error writing routes to file: {e}")
+        return None
+
+    count_rows(rows_in=len(routes_df), rows_out=len(routes_df))
+    missing = int(np.isnan(distances).sum())
+    print(f"Route distances written to {output_file_path}. {missing} routes without a distance.")
+    return missing
+
+
+if __name__ == "__main__":
+    routes_csv = 'clean_data/routes.csv'
+    airports_csv = 'clean_data/airports.csv'
+
+    run_script('route_distances', add_route_distances, routes_csv, airports_csv)
@@ -0,0 +1,234 @@
+import pandas as pd
+
+from instrumentation import count_rejected, count_rows, record_failure, run_script
+from reference_index import AirlineIndex, AirportIndex, EquipmentIndex
+from routes_pipeline import HEADER_RENAMES
+
+# Column positions are the same as in the row-based scripts
+AIRLINE_ID_IDX = 2
+SOURCE_AIRPORT_NAME_IDX = 3
+SOURCE_AIRPORT_ID_IDX = 4
+DESTINATION_AIRPORT_NAME_IDX = 5
+DESTINATION_AIRPORT_ID_IDX = 6
+CODESHARE_IDX = 7
+EQUIPMENT_IDX = 9
+
+
+def read_csv_as_text(file_path):
+    """
+    Reads a CSV file with every value kept as the exact string in the file
+    ('\\N' and '' are not turned into NaN), so writing it back is lossless.
+
+    Args:
+        file_path (str): Path to the CSV file.
+
+    Returns:
+        pd.DataFrame: The file contents as strings.
+    """
+    return pd.read_csv(file_path, dtype=str, keep_default_na=False, na_filter=False)
+
+
+def write_csv_like_csv_module(df, file_path):
+    """
+    Writes a DataFrame in the same format as csv.writer (minimal quoting,
+    '\\r\\n' line endings), so the output matches the row-based scripts byte for byte.
+
+    Args:
+        df (pd.DataFrame): Data to write.
+        file_path (str): Path to the output CSV file.
+    """
+    df.to_csv(file_path, index=False, lineterminator='\r\n')
+
+
+def _lookup_airport_names(airports, names):
+    """Airport IDs as strings by name, NaN for unknown names."""
+    ids = pd.Series(airports.lookup('name', names.to_numpy()), index=names.index)
+    return ids.astype(str).where(ids >= 0)
+
+
+def resolve_airport_ids_columnar(routes_df, airports):
+    """
+    Columnar version of clean_routes.resolve_airport_ids: replaces '\\N' airport
+    IDs with the ID looked up by airport name and drops rows with no match.
+
+    Args:
+        routes_df (pd.DataFrame): Routes data as strings.
+        airports (AirportIndex): The airports reference index.
+
+    Returns:
+        tuple: (cleaned DataFrame, dict of rejected row counts per rule)
+    """
+
+    source_id = routes_df.columns[SOURCE_AIRPORT_ID_IDX]
+    source_name = routes_df.columns[SOURCE_AIRPORT_NAME_IDX]
+    destination_id = routes_df.columns[DESTINATION_AIRPORT_ID_IDX]
+    destination_name = routes_df.columns[DESTINATION_AIRPORT_NAME_IDX]
+
+    source_missing = routes_df[source_id] == '\\N'
+    source_lookup = _lookup_airport_names(airports, routes_df[source_name])
+    source_unknown = source_missing & source_lookup.isna()
+
+    # Destination IDs are only looked up for rows the source check kept
+    destination_missing = (routes_df[destination_id] == '\\N') & ~source_unknown
+    destination_lookup = _lookup_airport_names(airports, routes_df[destination_name])
+    destination_unknown = destination_missing & destination_lookup.isna()
+
+    cleaned_df = routes_df.copy()
+    cleaned_df.loc[source_missing, source_id] = source_lookup[source_missing]
+    cleaned_df.loc[destination_missing, destination_id] = destination_lookup[destination_missing]
+    cleaned_df = cleaned_df[~(source_unknown | destination_unknown)]
+
+    rejected = {
+        'unknown_source_airport': int(source_unknown.sum()),
+        'unknown_destination_airport': int(destination_unknown.sum()),
+    }
+    return cleaned_df, rejected
+
+
+def drop_unknown_airline_rows_columnar(routes_df):
+    """
+    Columnar version of remove_invalid_airline_routes.drop_unknown_airline_rows:
+    drops rows where 'Airline ID' is '\\N'.
+
+    Args:
+        routes_df (pd.DataFrame): Routes data as strings.
+
+    Returns:
+        tuple: (cleaned DataFrame, dict of rejected row counts per rule)
+    """
+    unknown_airline = routes_df.iloc[:, AIRLINE_ID_IDX] == '\\N'
+    return routes_df[~unknown_airline], {'unknown_airline': int(unknown_airline.sum())}
+
+
+def normalize_codeshare_columnar(routes_df):
+    """
+    Columnar version of transform_codeshare.normalize_codeshare: maps '' to '0'
+    and 'Y' to '1' in the 'Codeshare' column, leaving other values unchanged.
+
+    Args:
+        routes_df (pd.DataFrame): Routes data as strings.
+
+    Returns:
+        tuple: (transformed DataFrame, empty dict since no rows are rejected)
+    """
+    codeshare = routes_df.columns[CODESHARE_IDX]
+    stripped = routes_df[codeshare].str.strip()
+
+    transformed_df = routes_df.copy()
+    transformed_df[codeshare] = (
+        routes_df[codeshare]
+        .mask(stripped == '', '0')
+        .mask(stripped == 'Y', '1')
+    )
+    return transformed_df, {}
+
+
+def filter_valid_routes_columnar(routes_df, airlines, airports, equipment):
+    """
+    Columnar version of validate_routes_data.filter_valid_routes. The rules are
+    checked in the same order as the row-based script and each rejected row is
+    counted under the first rule it fails.
+
+    Args:
+        routes_df (pd.DataFrame): Routes data as strings.
+        airlines (AirlineIndex): The airlines reference index.
+        airports (AirportIndex): The airports reference index.
+        equipment (EquipmentIndex): The airplanes reference index.
+
+    Returns:
+        tuple: (validated DataFrame, dict of rejected row counts per rule)
+    """
+    airline_ok = airlines.contains(routes_df.iloc[:, AIRLINE_ID_IDX].to_numpy())
+    source_ok = airports.contains(routes_df.iloc[:, SOURCE_AIRPORT_ID_IDX].to_numpy())
+    destination_ok = airports.contains(routes_df.iloc[:, DESTINATION_AIRPORT_ID_IDX].to_numpy())
+
+    # Explode the space separated equipment codes once and check them all in bulk
+    codes = routes_df.iloc[:, EQUIPMENT_IDX].str.split(' ').explode()
+    invalid_codes = codes[(codes != '') & ~equipment.contains_codes(codes.fillna('').to_numpy())]
+    equipment_ok = ~routes_df.index.isin(invalid_codes.index)
+
+    rejected = {}
+    keep = pd.Series(True, index=routes_df.index)
+    for rule, ok in [
+        ('invalid_airline_id', airline_ok),
+        ('invalid_source_airport_id', source_ok),
+        ('invalid_destination_airport_id', destination_ok),
+        ('invalid_equipment', equipment_ok),
+    ]:
+        rejected[rule] = int((keep & ~ok).sum())
+        keep &= ok
+
+    return routes_df[keep], rejected
+
+
+def run_routes_columnar(routes_file_path, airlines_file_path, airports_file_path, airplanes_file_path, output_file_path):
+    """
+    Columnar equivalent of routes_pipeline.run_routes_pipeline. Every stage works
+    on whole columns instead of looping over rows in Python; the output file is
+    byte-identical to the row-based pipeline.
+
+    Args:
+        routes_file_path (str): Path to the source routes CSV file.
+        airlines_file_path (str): Path to the clean airlines CSV file.
+        airports_file_path (str): Path to the clean airports CSV file.
+        airplanes_file_path (str): Path to the clean airplanes CSV file.
+        output_file_path (str): Path to the final routes CSV file.
+
+    Returns:
+        dict: Rejected row counts per rule, or None if the run failed.
+    """
+    try:
+        routes_df = read_csv_as_text(routes_file_path)
+        airlines = AirlineIndex.cached(airlines_file_path)
+        airports = AirportIndex.cached(airports_file_path)
+        equipment = EquipmentIndex.cached(airplanes_file_path)
+    except FileNotFoundError as e:
+        record_failure(f"Error: File not found: {e.filename}")
+        return None
+    except Exception as e:
+        record_failure(f"Error reading input files: {e}")
+        return None
+
+    rows_read = len(routes_df)
+    rejected = {}
+    routes_df, stage_rejected = resolve_airport_ids_columnar(routes_df, airports)
+    rejected.update(stage_rejected)
+    routes_df, stage_rejected = drop_unknown_airline_rows_columnar(routes_df)
+    rejected.update(stage_rejected)
+    routes_df, stage_rejected = normalize_codeshare_columnar(routes_df)
+    rejected.update(stage_rejected)
+    routes_df, stage_rejected = filter_valid_routes_columnar(
+        routes_df, airlines, airports, equipment
+    )
+    rejected.update(stage_rejected)
+
+    routes_df = routes_df.apply(lambda column: column.str.rstrip())
+    routes_df = routes_df.rename(columns=HEADER_RENAMES)
+
+    try:
+        write_csv_like_csv_module(routes_df, output_file_path)
+    except Exception as e:
+        record_failure(f"Error writing routes to file: {e}")
+        return None
+
+    count_rows(rows_in=rows_read, rows_out=len(routes_df))
+    print(f"Columnar routes written to {output_file_path}. {len(routes_df)} rows remaining.")
+    for rule, count in rejected.items():
+        count_rejected(rule, count)
+        print(f"  {rule}: {count} rows rejected")
+    return rejected
+
+
+if __name__ == "__main__":
+    # Imported here, route_distances itself imports the routes modules
+    from route_distances import add_route_distances
+
+    routes_csv = 'source_data/routes.csv'
+    airlines_csv = 'clean_data/airlines.csv'
+    airports_csv = 'clean_data/airports.csv'
+    airplanes_csv = 'clean_data/airplanes.csv'
+    output_csv = 'clean_data/routes.csv'
+
+    run_script('routes_columnar', run_routes_columnar, routes_csv, airlines_csv, airports_csv, airplanes_csv, output_csv)
+    # clean_data/ingestion.sql expects the distance column, as build.py writes it
+    run_script('route_distances', add_route_distances, output_csv, airports_csv)
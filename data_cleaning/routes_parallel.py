@@ -0,0 +1,174 @@
+import csv
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from multiprocessing import Pool
+
+from instrumentation import count_rejected, count_rows, counting, measure, record_failure, run_script
+from routes_pipeline import HEADER_RENAMES, build_routes_stages, run_stages
+
+# Upper bound on the bytes a worker decodes at once
+MAX_SHARD_BYTES = 64 * 1024 * 1024
+
+# Set before the pool starts so that forked workers share the reference data
+# read-only instead of each loading their own copy
+_stages = None
+
+
+def find_shard_boundaries(routes_file_path, num_shards):
+    """
+    Splits a CSV file into byte ranges that start and end on line boundaries.
+    Assumes no quoted field contains a newline, which holds for the routes data.
+
+    Args:
+        routes_file_path (str): Path to the routes CSV file.
+        num_shards (int): Desired number of shards.
+
+    Returns:
+        tuple: (header line as str, list of (start, end) byte offsets)
+    """
+    with open(routes_file_path, mode='rb') as infile:
+        file_size = os.fstat(infile.fileno()).st_size
+        if file_size == 0:
+            return '', []
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b'\n') + 1 or file_size
+            header = mm[:header_end].decode('utf-8')
+
+            data_size = file_size - header_end
+            boundaries = [header_end]
+            for shard in range(1, num_shards):
+                target = header_end + data_size * shard // num_shards
+                if target <= boundaries[-1]:
+                    continue
+                line_end = mm.find(b'\n', target)
+                if line_end == -1:
+                    break
+                if line_end + 1 > boundaries[-1]:
+                    boundaries.append(line_end + 1)
+            if boundaries[-1] < file_size:
+                boundaries.append(file_size)
+
+    return header, list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _init_worker(airlines_file_path, airports_file_path, airplanes_file_path):
+    """Loads the reference data in workers that were not forked from a parent that has it."""
+    global _stages
+    if _stages is None:
+        _stages = build_routes_stages(airlines_file_path, airports_file_path, airplanes_file_path)
+
+
+def _process_shard(task):
+    """
+    Cleans and validates one byte range of the routes file and writes the
+    surviving rows to a shard file.
+
+    Args:
+        task (tuple): (routes file path, start offset, end offset, shard output path)
+
+    Returns:
+        tuple: (shard output path, number of rows read, number of rows written,
+        dict of rejected row counts per rule)
+    """
+    routes_file_path, start, end, shard_file_path = task
+    with open(routes_file_path, mode='rb') as infile:
+        with mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode('utf-8')
+
+    rows_written = 0
+    # The stages count their rejected rows in the worker; the parent adds them up
+    with measure('shard') as metrics, open(shard_file_path, mode='w', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        for row in run_stages(counting(csv.reader(io.StringIO(text, newline=''))), _stages):
+            writer.writerow(row)
+            rows_written += 1
+    return shard_file_path, metrics.rows_in, rows_written, metrics.rejected
+
+
+def run_routes_parallel(routes_file_path, airlines_file_path, airports_file_path, airplanes_file_path,
+                        output_file_path, num_workers=None):
+    """
+    Parallel version of routes_pipeline.run_routes_pipeline. The routes file is
+    split into line-aligned byte ranges, each range is cleaned and validated in a
+    process pool, and the shard outputs are concatenated in file order, which is
+    Route_ID order for the routes data. The output is identical to the serial pipeline.
+
+    Args:
+        routes_file_path (str): Path to the source routes CSV file.
+        airlines_file_path (str): Path to the clean airlines CSV file.
+        airports_file_path (str): Path to the clean airports CSV file.
+        airplanes_file_path (str): Path to the clean airplanes CSV file.
+        output_file_path (str): Path to the final routes CSV file.
+        num_workers (int): Number of worker processes. Defaults to the number of CPUs.
+
+    Returns:
+        int: Number of rows written, or None if the pipeline failed.
+    """
+    global _stages
+    num_workers = num_workers or os.cpu_count() or 1
+
+    try:
+        _stages = build_routes_stages(airlines_file_path, airports_file_path, airplanes_file_path)
+        file_size = os.path.getsize(routes_file_path)
+        # A few shards per worker keeps the pool busy when shards take different times
+        num_shards = max(num_workers * 4, file_size // MAX_SHARD_BYTES + 1)
+        header, shards = find_shard_boundaries(routes_file_path, num_shards)
+    except FileNotFoundError as e:
+        record_failure(f"Error: File not found: {e.filename}")
+        return None
+    except Exception as e:
+        record_failure(f"Error preparing routes shards: {e}")
+        return None
+
+    output_dir = os.path.dirname(os.path.abspath(output_file_path))
+    tmp_output_file_path = output_file_path + '.tmp'
+    rows_written = 0
+    try:
+        with tempfile.TemporaryDirectory(dir=output_dir) as shard_dir:
+            tasks = [
+                (routes_file_path, start, end, os.path.join(shard_dir, f'shard_{shard_idx:05d}.csv'))
+                for shard_idx, (start, end) in enumerate(shards)
+            ]
+            with Pool(num_workers, initializer=_init_worker,
+                      initargs=(airlines_file_path, airports_file_path, airplanes_file_path)) as pool:
+                # imap keeps the results in shard order
+                results = list(pool.imap(_process_shard, tasks))
+
+            with open(tmp_output_file_path, mode='w', newline='', encoding='utf-8') as outfile:
+                header_row = next(csv.reader([header]))
+                csv.writer(outfile).writerow([HEADER_RENAMES.get(column, column) for column in header_row])
+                for shard_file_path, shard_rows_read, shard_rows, shard_rejected in results:
+                    with open(shard_file_path, mode='r', newline='', encoding='utf-8') as shard_file:
+                        shutil.copyfileobj(shard_file, outfile)
+                    rows_written += shard_rows
+                    count_rows(rows_in=shard_rows_read, rows_out=shard_rows)
+                    for rule, count in shard_rejected.items():
+                        count_rejected(rule, count)
+        os.replace(tmp_output_file_path, output_file_path)
+    except Exception as e:
+        record_failure(f"Error running parallel routes pipeline: {e}")
+        if os.path.exists(tmp_output_file_path):
+            os.remove(tmp_output_file_path)
+        return None
+
+    print(f"Parallel routes pipeline written to {output_file_path} from {len(shards)} shards. "
+          f"{rows_written} rows remaining.")
+    return rows_written
+
+
+if __name__ == "__main__":
+    # Imported here, route_distances itself imports the routes modules
+    from route_distances import add_route_distances
+
+    routes_csv = 'source_data/routes.csv'
+    airlines_csv = 'clean_data/airlines.csv'
+    airports_csv = 'clean_data/airports.csv'
+    airplanes_csv = 'clean_data/airplanes.csv'
+    output_csv = 'clean_data/routes.csv'
+
+    run_script('routes_parallel', run_routes_parallel, routes_csv, airlines_csv, airports_csv, airplanes_csv, output_csv)
+    # clean_data/ingestion.sql expects the distance column, as build.py writes it
+    run_script('route_distances', add_route_distances, output_csv, airports_csv)
@@ -0,0 +1,140 @@
+import csv
+import os
+
+from clean_routes import resolve_airport_ids
+from instrumentation import count_rows, counting, record_failure, run_script
+from reference_index import AirlineIndex, AirportIndex, EquipmentIndex
+from remove_invalid_airline_routes import drop_unknown_airline_rows
+from transform_codeshare import normalize_codeshare
+from validate_routes_data import filter_valid_routes
+
+# The source file names the row number column 'index'; the clean file calls it 'Route_ID'
+HEADER_RENAMES = {'index': 'Route_ID'}
+
+
+def strip_trailing_whitespace(rows):
+    """
+    Generator stage: removes trailing whitespace from every field
+    (e.g. the trailing space in some 'Equipment' values).
+
+    Args:
+        rows (iterable): Routes data rows (without header).
+
+    Yields:
+        list: Every row, stripped.
+    """
+    for row in rows:
+        yield [field.rstrip() for field in row]
+
+
+def build_routes_stages(airlines_file_path, airports_file_path, airplanes_file_path):
+    """
+    Loads the reference data once, from the snapshots of the reference indexes,
+    and returns the routes cleaning stages in the order the individual scripts are run.
+
+    Args:
+        airlines_file_path (str): Path to the clean airlines CSV file.
+        airports_file_path (str): Path to the clean airports CSV file.
+        airplanes_file_path (str): Path to the clean airplanes CSV file.
+
+    Returns:
+        list: Callables that each take an iterable of rows and return a generator of rows.
+    """
+    airports = AirportIndex.cached(airports_file_path)
+    airport_name_to_id = airports.key_to_id('name')
+    valid_airline_ids = AirlineIndex.cached(airlines_file_path).key_set()
+    valid_airport_ids = airports.key_set()
+    valid_equipment_codes = EquipmentIndex.cached(airplanes_file_path).key_set('iata')
+
+    return [
+        lambda rows: resolve_airport_ids(rows, airport_name_to_id),
+        drop_unknown_airline_rows,
+        normalize_codeshare,
+        lambda rows: filter_valid_routes(rows, valid_airline_ids, valid_airport_ids, valid_equipment_codes),
+        strip_trailing_whitespace,
+    ]
+
+
+def run_stages(rows, stages):
+    """
+    Chains generator stages so that every row flows through all of them lazily.
+
+    Args:
+        rows (iterable): Routes data rows (without header).
+        stages (list): Stage callables, applied in order.
+
+    Returns:
+        iterator: The rows that survive every stage.
+    """
+    for stage in stages:
+        rows = stage(rows)
+    return rows
+
+
+def run_routes_pipeline(routes_file_path, airlines_file_path, airports_file_path, airplanes_file_path, output_file_path):
+    """
+    Runs clean_routes, remove_invalid_airline_routes, transform_codeshare and
+    validate_routes_data as one streaming pass: the source routes are read once,
+    every row flows through all stages, and only the final file is written.
+    No intermediate files are created and memory does not grow with the input.
+
+    Args:
+        routes_file_path (str): Path to the source routes CSV file.
+        airlines_file_path (str): Path to the clean airlines CSV file.
+        airports_file_path (str): Path to the clean airports CSV file.
+        airplanes_file_path (str): Path to the clean airplanes CSV file.
+        output_file_path (str): Path to the final routes CSV file.
+
+    Returns:
+        int: Number of rows written, or None if the pipeline failed.
+    """
+    try:
+        stages = build_routes_stages(airlines_file_path, airports_file_path, airplanes_file_path)
+    except FileNotFoundError as e:
+        record_failure(f"Error: Reference file not found: {e.filename}")
+        return None
+    except Exception as e:
+        record_failure(f"Error reading reference files: {e}")
+        return None
+
+    # Write to a temporary file first so a failed run never leaves a half-written output
+    tmp_output_file_path = output_file_path + '.tmp'
+    rows_written = 0
+    try:
+        with open(routes_file_path, mode='r', newline='', encoding='utf-8') as infile, \
+                open(tmp_output_file_path, mode='w', newline='', encoding='utf-8') as outfile:
+            reader = csv.reader(infile)
+            writer = csv.writer(outfile)
+            header = next(reader)  # Read header
+            writer.writerow([HEADER_RENAMES.get(column, column) for column in header])
+            for row in run_stages(counting(reader), stages):
+                writer.writerow(row)
+                rows_written += 1
+        os.replace(tmp_output_file_path, output_file_path)
+        count_rows(rows_out=rows_written)
+    except FileNotFoundError:
+        record_failure(f"Error: Routes file not found at {routes_file_path}")
+        return None
+    except Exception as e:
+        record_failure(f"Error running routes pipeline: {e}")
+        if os.path.exists(tmp_output_file_path):
+            os.remove(tmp_output_file_path)
+        return None
+
+    print(f"Routes pipeline written to {output_file_path}. {rows_written} rows remaining.")
+    return rows_written
+
+
+if __name__ == "__main__":
+    # Imported here, route_distances itself imports the routes modules
+    from route_distances import add_route_distances
+
+    routes_csv = 'source_data/routes.csv'
+    airlines_csv = 'clean_data/airlines.csv'
+    airports_csv = 'clean_data/airports.csv'
+    airplanes_csv = 'clean_data/airplanes.csv'
+    output_csv = 'clean_data/routes.csv'
+
+    run_script('routes_pipeline', run_routes_pipeline, routes_csv, airlines_csv, airports_csv, airplanes_csv, output_csv)
+    # clean_data/ingestion.sql expects the distance column, as build.py writes it
+    run_script('route_distances', add_route_distances, output_csv, airports_csv)
@@ -1,5 +1,32 @@
 import csv
 
+from instrumentation import count_rows, counting, record_failure, run_script
+
+# Assuming 'Codeshare' is at index 7
+CODESHARE_IDX = 7
+
+
+def normalize_codeshare(rows):
+    """
+    Generator stage: translates '' to '0' and 'Y' to '1' in the 'Codeshare'
+    column. Other values remain unchanged. Rows are modified in place.
+
+    Args:
+        rows (iterable): Routes data rows (without header).
+
+    Yields:
+        list: Every row, transformed.
+    """
+    for row in rows:
+        if len(row) > CODESHARE_IDX:
+            codeshare_value = row[CODESHARE_IDX].strip()
+            if codeshare_value == '':
+                row[CODESHARE_IDX] = '0'
+            elif codeshare_value == 'Y':
+                row[CODESHARE_IDX] = '1'
+        yield row
+
+
 def transform_codeshare_column(input_routes_file_path, output_routes_file_path):
     """
     Transforms the 'Codeshare' column in the routes data:
@@ -18,35 +45,25 @@ def transform_codeshare_column(input_routes_file_path, output_routes_file_path):
             reader = csv.reader(infile)
             header = next(reader)  # Read header
             transformed_rows.append(header)  # Keep the header
-
-            # Assuming 'Codeshare' is at index 7
-            codeshare_idx = 7
-            
-            for row in reader:
-                if len(row) > codeshare_idx:
-                    codeshare_value = row[codeshare_idx].strip()
-                    if codeshare_value == '':
-                        row[codeshare_idx] = '0'
-                    elif codeshare_value == 'Y':
-                        row[codeshare_idx] = '1'
-                transformed_rows.append(row)
+            transformed_rows.extend(normalize_codeshare(counting(reader)))
 
     except FileNotFoundError:
-        print(f"Error: Input routes file not found at {input_routes_file_path}")
+        record_failure(f"Error: Input routes file not found at {input_routes_file_path}")
         return
     except Exception as e:
-        print(f"Error reading routes file: {e}")
+        record_failure(f"Error reading routes file: {e}")
         return
 
     try:
         with open(output_routes_file_path, mode='w', newline='', encoding='utf-8') as outfile:
             writer = csv.writer(outfile)
             writer.writerows(transformed_rows)
+        count_rows(rows_out=len(transformed_rows) - 1)
         print(f"Transformed data written to {output_routes_file_path}. {len(transformed_rows) - 1} rows remaining.")
     except Exception as e:
-        print(f"Error writing transformed data to file: {e}")
+        record_failure(f"Error writing transformed data to file: {e}")
 
 if __name__ == "__main__":
     input_csv = 'clean_data/routes.csv'
     output_csv = 'clean_data/routes_transformed_codeshare.csv'
-    transform_codeshare_column(input_csv, output_csv)
+    run_script('transform_codeshare', transform_codeshare_column, input_csv, output_csv)
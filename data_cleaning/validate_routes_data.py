@@ -1,5 +1,68 @@
 import csv
 
+from instrumentation import count_rejected, count_rows, counting, record_failure, run_script
+from reference_index import AirlineIndex, AirportIndex, EquipmentIndex
+
+# Assuming column indices for routes.csv:
+# Airline ID: 2
+# Source airport ID: 4
+# Destination airport ID: 6
+# Equipment: 9
+AIRLINE_ID_IDX = 2
+SOURCE_AIRPORT_ID_IDX = 4
+DESTINATION_AIRPORT_ID_IDX = 6
+EQUIPMENT_IDX = 9
+
+
+def filter_valid_routes(rows, valid_airline_ids, valid_airport_ids, valid_equipment_codes):
+    """
+    Generator stage: yields only the routes whose airline, source airport,
+    destination airport and every equipment code exist in the reference sets.
+
+    Args:
+        rows (iterable): Routes data rows (without header).
+        valid_airline_ids (set): Valid 'Airline ID' values.
+        valid_airport_ids (set): Valid airport IDs.
+        valid_equipment_codes (set): Valid airplane IATA codes.
+
+    Yields:
+        list: The rows that pass validation.
+    """
+    for row in rows:
+        # Ensure row has enough columns to avoid IndexError
+        if len(row) <= EQUIPMENT_IDX:
+            count_rejected('malformed_row')
+            continue # Skip malformed rows
+
+        # Check Airline ID
+        if row[AIRLINE_ID_IDX] not in valid_airline_ids:
+            count_rejected('invalid_airline_id')
+            continue
+
+        # Check Source Airport ID
+        if row[SOURCE_AIRPORT_ID_IDX] not in valid_airport_ids:
+            count_rejected('invalid_source_airport_id')
+            continue
+
+        # Check Destination Airport ID
+        if row[DESTINATION_AIRPORT_ID_IDX] not in valid_airport_ids:
+            count_rejected('invalid_destination_airport_id')
+            continue
+
+        # Check Equipment (can be multiple codes separated by space)
+        equipment_codes_in_row = row[EQUIPMENT_IDX].split(' ')
+        all_equipment_valid = True
+        for code in equipment_codes_in_row:
+            if code and code not in valid_equipment_codes:
+                all_equipment_valid = False
+                break
+
+        if not all_equipment_valid:
+            count_rejected('invalid_equipment')
+            continue
+
+        yield row
+
 def validate_routes_data(routes_file_path, airlines_file_path, airports_file_path, airplanes_file_path, output_file_path):
     """
     Validates routes data against airlines, airports, and airplanes data.
@@ -17,53 +80,35 @@ def validate_routes_data(routes_file_path, airlines_file_path, airports_file_pat
         output_file_path (str): Path to the output cleaned routes CSV file.
     """
 
-    # 1. Load valid IDs from reference files into sets for efficient lookup
-    valid_airline_ids = set()
+    # 1. Load valid IDs from the reference indexes into sets for efficient lookup
     try:
-        with open(airlines_file_path, mode='r', newline='', encoding='utf-8') as infile:
-            reader = csv.reader(infile)
-            next(reader)  # Skip header
-            for row in reader:
-                if row and row[0].strip(): # Ensure ID is not empty or just whitespace
-                    valid_airline_ids.add(row[0].strip()) # Airline ID is at index 0
+        valid_airline_ids = AirlineIndex.cached(airlines_file_path).key_set()
         print(f"Loaded {len(valid_airline_ids)} valid airline IDs. Sample: {list(valid_airline_ids)[:5]}")
     except FileNotFoundError:
-        print(f"Error: Airlines file not found at {airlines_file_path}")
+        record_failure(f"Error: Airlines file not found at {airlines_file_path}")
         return
     except Exception as e:
-        print(f"Error reading airlines file: {e}")
+        record_failure(f"Error reading airlines file: {e}")
         return
 
-    valid_airport_ids = set()
     try:
-        with open(airports_file_path, mode='r', newline='', encoding='utf-8') as infile:
-            reader = csv.reader(infile)
-            next(reader)  # Skip header
-            for row in reader:
-                if row and row[0].strip(): # Ensure ID is not empty or just whitespace
-                    valid_airport_ids.add(row[0].strip()) # Airport ID is at index 0
+        valid_airport_ids = AirportIndex.cached(airports_file_path).key_set()
         print(f"Loaded {len(valid_airport_ids)} valid airport IDs. Sample: {list(valid_airport_ids)[:5]}")
     except FileNotFoundError:
-        print(f"Error: Airports file not found at {airports_file_path}")
+        record_failure(f"Error: Airports file not found at {airports_file_path}")
         return
     except Exception as e:
-        print(f"Error reading airports file: {e}")
+        record_failure(f"Error reading airports file: {e}")
         return
 
-    valid_equipment_codes = set()
     try:
-        with open(airplanes_file_path, mode='r', newline='', encoding='utf-8') as infile:
-            reader = csv.reader(infile)
-            next(reader)  # Skip header
-            for row in reader:
-                if len(row) > 1 and row[1].strip(): # IATA code is at index 1, ensure it exists and is not empty
-                    valid_equipment_codes.add(row[1].strip())
+        valid_equipment_codes = EquipmentIndex.cached(airplanes_file_path).key_set('iata')
         print(f"Loaded {len(valid_equipment_codes)} valid equipment codes. Sample: {list(valid_equipment_codes)[:5]}")
     except FileNotFoundError:
-        print(f"Error: Airplanes file not found at {airplanes_file_path}")
+        record_failure(f"Error: Airplanes file not found at {airplanes_file_path}")
         return
     except Exception as e:
-        print(f"Error reading airplanes file: {e}")
+        record_failure(f"Error reading airplanes file: {e}")
         return
 
     # 2. Process Routes: Read, validate, and store valid rows
@@ -73,53 +118,15 @@ def validate_routes_data(routes_file_path, airlines_file_path, airports_file_pat
             reader = csv.reader(infile)
             header = next(reader)  # Read header
             cleaned_rows.append(header)  # Keep the header
-
-            # Assuming column indices for routes.csv:
-            # Airline ID: 2
-            # Source airport ID: 4
-            # Destination airport ID: 6
-            # Equipment: 9
-            
-            airline_id_idx = 2
-            source_airport_id_idx = 4
-            destination_airport_id_idx = 6
-            equipment_idx = 9
-
-            for row in reader:
-                # Ensure row has enough columns to avoid IndexError
-                if len(row) <= equipment_idx:
-                    continue # Skip malformed rows
-
-                # Check Airline ID
-                if row[airline_id_idx] not in valid_airline_ids:
-                    continue
-
-                # Check Source Airport ID
-                if row[source_airport_id_idx] not in valid_airport_ids:
-                    continue
-
-                # Check Destination Airport ID
-                if row[destination_airport_id_idx] not in valid_airport_ids:
-                    continue
-
-                # Check Equipment (can be multiple codes separated by space)
-                equipment_codes_in_row = row[equipment_idx].split(' ')
-                all_equipment_valid = True
-                for code in equipment_codes_in_row:
-                    if code and code not in valid_equipment_codes:
-                        all_equipment_valid = False
-                        break
-                
-                if not all_equipment_valid:
-                    continue
-
-                cleaned_rows.append(row)
+            cleaned_rows.extend(
+                filter_valid_routes(counting(reader), valid_airline_ids, valid_airport_ids, valid_equipment_codes)
+            )
 
     except FileNotFoundError:
-        print(f"Error: Routes file not found at {routes_file_path}")
+        record_failure(f"Error: Routes file not found at {routes_file_path}")
         return
     except Exception as e:
-        print(f"Error reading routes file: {e}")
+        record_failure(f"Error reading routes file: {e}")
         return
 
     # 3. Write Output: Write the validated data to a new file
@@ -127,9 +134,10 @@ def validate_routes_data(routes_file_path, airlines_file_path, airports_file_pat
         with open(output_file_path, mode='w', newline='', encoding='utf-8') as outfile:
             writer = csv.writer(outfile)
             writer.writerows(cleaned_rows)
+        count_rows(rows_out=len(cleaned_rows) - 1)
         print(f"Validated data written to {output_file_path}. {len(cleaned_rows) - 1} rows remaining.")
     except Exception as e:
-        print(f"Error writing validated data to file: {e}")
+        record_failure(f"Error writing validated data to file: {e}")
 
 if __name__ == "__main__":
     routes_csv = 'clean_data/routes.csv'
@@ -138,4 +146,4 @@ if __name__ == "__main__":
     airplanes_csv = 'clean_data/airplanes.csv'
     output_csv = 'clean_data/routes_fully_validated.csv'
     
-    validate_routes_data(routes_csv, airlines_csv, airports_csv, airplanes_csv, output_csv)
+    run_script('validate_routes_data', validate_routes_data, routes_csv, airlines_csv, airports_csv, airplanes_csv, output_csv)
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import io
+import os
+import time
+
+import psycopg
+
+from bulk_load import CLEAN_DATA_DIR, COPY_BLOCK_SIZE, DSN, TABLES, column_names, key_index
+from row_hashes import CREATE_HASH_TABLE, HASH_TABLE, delete_row_hashes, hash_csv_rows, load_row_hashes, save_row_hashes
+
+
+def diff_row_hashes(new_hashes, old_hashes):
+    """
+    Compares the row hashes of a new snapshot with the loaded ones.
+
+    Args:
+        new_hashes (dict): Key -> row hash of the new snapshot.
+        old_hashes (dict): Key -> row hash of the loaded rows (None if unknown).
+
+    Returns:
+        dict: "insert", "update" and "delete" -> set of keys.
+    """
+    changed = {key for key, row_hash in new_hashes.items() if old_hashes.get(key) != row_hash}
+    inserted = changed - old_hashes.keys()
+    return {
+        "insert": inserted,
+        "update": changed - inserted,
+        "delete": old_hashes.keys() - new_hashes.keys(),
+    }
+
+
+def _loaded_row_hashes(conn, table, definition, target_schema):
+    """
+    The stored row hashes of a table. A table without stored hashes (loaded
+    before they were recorded) reports its keys with unknown hashes, so every
+    row of the new snapshot is applied once and stale rows are still deleted.
+    """
+    old_hashes = load_row_hashes(conn, table)
+    if not old_hashes:
+        with conn.cursor() as cur:
+            cur.execute(f'SELECT "{definition["key"]}"::text FROM {target_schema}.{table}')
+            old_hashes = {key: None for (key,) in cur}
+    return old_hashes
+
+
+def _function_exists(conn, signature):
+    return conn.execute("SELECT to_regprocedure(%s) IS NOT NULL", (signature,)).fetchone()[0]
+
+
+def _copy_rows(conn, table, csv_path, keys, key_position, null):
+    """Streams the rows of a CSV file whose key is in keys into a table."""
+    options = "FORMAT csv"
+    if null is not None:
+        options += f", NULL '{null}'"
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {table} FROM STDIN WITH ({options})") as copy:
+            with open(csv_path, mode="r", newline="", encoding="utf-8") as infile:
+                reader = csv.reader(infile)
+                next(reader)  # Skip header
+                for row in reader:
+                    if row[key_position] in keys:
+                        writer.writerow(row)
+                        if buffer.tell() >= COPY_BLOCK_SIZE:
+                            copy.write(buffer.getvalue())
+                            buffer.seek(0)
+                            buffer.truncate()
+            copy.write(buffer.getvalue())
+
+
+def _refresh_routes_enriched(conn, changes):
+    """
+    Brings routes_enriched (clean_data/routes_enriched.sql) up to date. Changed
+    airports or countries can affect any route, so they rebuild the table;
+    changed routes only rebuild their own rows.
+
+    Returns:
+        bool: Whether routes_enriched was refreshed.
+    """
+    if not _function_exists(conn, "refresh_routes_enriched(integer[])"):
+        return False
+    if any(changes["airports"].values()) or any(changes["countries"].values()):
+        conn.execute("SELECT refresh_routes_enriched()")
+        return True
+    route_ids = [int(key) for keys in changes["routes"].values() for key in keys]
+    if route_ids:
+        conn.execute("SELECT refresh_routes_enriched(%s)", (route_ids,))
+    return bool(route_ids)
+
+
+def merge_changed_rows(conn, table, definition, csv_path, keys, target_schema="public"):
+    """
+    Inserts and updates the changed rows of a table with one MERGE. The rows are
+    first copied into a temporary staging table that is dropped at commit.
+
+    Args:
+        conn (psycopg.Connection): Connection inside the delta transaction.
+        table (str): Table name.
+        definition (dict): Table definition from bulk_load.TABLES.
+        csv_path (str): Path to the table's clean CSV file.
+        keys (set): Keys of the inserted and updated rows.
+        target_schema (str): Schema of the live table.
+    """
+    columns = column_names(definition)
+    key = definition["key"]
+    staging = f"delta_{table}"
+    conn.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT * FROM {target_schema}.{table} WITH NO DATA")
+    _copy_rows(conn, staging, csv_path, keys, key_index(definition), definition["null"])
+
+    updates = ", ".join(f'"{column}" = s."{column}"' for column in columns if column != key)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    values = ", ".join(f's."{column}"' for column in columns)
+    conn.execute(f"""
+        MERGE INTO {target_schema}.{table} AS t
+        USING {staging} AS s ON t."{key}" = s."{key}"
+        WHEN MATCHED THEN UPDATE SET {updates}
+        WHEN NOT MATCHED THEN INSERT ({column_list}) VALUES ({values})
+    """)
+
+
+def merge_deleted_rows(conn, table, definition, keys, target_schema="public"):
+    """
+    Deletes rows of a table by key with one MERGE.
+
+    Args:
+        conn (psycopg.Connection): Connection inside the delta transaction.
+        table (str): Table name.
+        definition (dict): Table definition from bulk_load.TABLES.
+        keys (set): Keys of the deleted rows.
+        target_schema (str): Schema of the live table.
+    """
+    key = definition["key"]
+    staging = f"deleted_{table}"
+    conn.execute(f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT "{key}" FROM {target_schema}.{table} WITH NO DATA')
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {staging} FROM STDIN") as copy:
+            for deleted_key in keys:
+                copy.write_row((deleted_key,))
+    conn.execute(f"""
+        MERGE INTO {target_schema}.{table} AS t
+        USING {staging} AS s ON t."{key}" = s."{key}"
+        WHEN MATCHED THEN DELETE
+    """)
+
+
+def delta_load(dsn=DSN, clean_data_dir=CLEAN_DATA_DIR, tables=TABLES, target_schema="public"):
+    """
+    Applies a new snapshot of the clean CSV files to the loaded tables without
+    replacing them. Every row of the snapshot is hashed and compared by key with
+    the hashes stored at the last load; only inserted, updated and deleted rows
+    are sent to the database.
+
+    All changes are applied in one transaction, so readers see either the old or
+    the new snapshot and queries never fail during a refresh:
+    1. Changed rows are merged into each table, referenced tables first.
+    2. Deleted rows are merged out of each table, referencing tables first.
+    3. The rollups are rebuilt if airports changed. Changes to routes alone are
+       handled by the rollup triggers, which see MERGE like any insert, update
+       or delete.
+    4. routes_enriched is rebuilt if airports or countries changed, otherwise
+       only the rows of changed routes are.
+    5. The stored row hashes and data_versions checksums of changed tables are updated.
+
+    Args:
+        dsn (str): PostgreSQL connection string.
+        clean_data_dir (str): Directory with the clean CSV files.
+        tables (dict): Table definitions, in dependency order.
+        target_schema (str): Schema of the live tables.
+
+    Returns:
+        dict: Table -> number of inserted, updated and deleted rows.
+    """
+    start = time.perf_counter()
+    csv_paths = {table: os.path.join(clean_data_dir, definition["file"]) for table, definition in tables.items()}
+    new_hashes = {table: hash_csv_rows(csv_paths[table], key_index(definition)) for table, definition in tables.items()}
+
+    with psycopg.connect(dsn) as conn:
+        with conn.transaction():
+            conn.execute(CREATE_HASH_TABLE)
+            # Two refreshes at once would both diff against the same stored hashes
+            conn.execute(f"LOCK TABLE {HASH_TABLE} IN EXCLUSIVE MODE")
+            changes = {
+                table: diff_row_hashes(new_hashes[table], _loaded_row_hashes(conn, table, definition, target_schema))
+                for table, definition in tables.items()
+            }
+
+            for table, definition in tables.items():
+                changed = changes[table]["insert"] | changes[table]["update"]
+                if changed:
+                    merge_changed_rows(conn, table, definition, csv_paths[table], changed, target_schema)
+            for table, definition in reversed(list(tables.items())):
+                if changes[table]["delete"]:
+                    merge_deleted_rows(conn, table, definition, changes[table]["delete"], target_schema)
+
+            # The rollup triggers only watch routes; a changed airport (e.g. its
+            # country) needs a rebuild, which is cheap next to a full reload
+            if any(changes["airports"].values()) and _function_exists(conn, "refresh_rollups()"):
+                conn.execute("SELECT refresh_rollups()")
+            refresh_enriched = _refresh_routes_enriched(conn, changes)
+
+            record_versions = _function_exists(conn, "record_data_version(text)")
+            for table, table_changes in changes.items():
+                changed = table_changes["insert"] | table_changes["update"]
+                if not changed and not table_changes["delete"]:
+                    continue
+                delete_row_hashes(conn, table, changed | table_changes["delete"])
+                save_row_hashes(conn, table, {key: new_hashes[table][key] for key in changed})
+                if record_versions:
+                    conn.execute("SELECT record_data_version(%s)", (table,))
+            if refresh_enriched and record_versions:
+                conn.execute("SELECT record_data_version('routes_enriched')")
+
+    counts = {table: {action: len(keys) for action, keys in table_changes.items()}
+              for table, table_changes in changes.items()}
+    for table, table_counts in counts.items():
+        print(f"{table}: {table_counts['insert']} inserted, {table_counts['update']} updated, "
+              f"{table_counts['delete']} deleted")
+    print(f"Delta load finished in {time.perf_counter() - start:.2f}s")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the changes in clean_data to the loaded tables.")
+    parser.add_argument("--dsn", default=DSN, help="PostgreSQL connection string")
+    parser.add_argument("--data-dir", default=CLEAN_DATA_DIR, help="directory with the clean CSV files")
+    args = parser.parse_args()
+
+    delta_load(args.dsn, args.data_dir)
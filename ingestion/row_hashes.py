@@ -0,0 +1,68 @@
+import csv
+import hashlib
+
+# Content hash of every loaded row, by table and key, as of the last bulk or delta load
+HASH_TABLE = "ingested_row_hashes"
+CREATE_HASH_TABLE = f"""
+    CREATE TABLE IF NOT EXISTS {HASH_TABLE} (
+        table_name TEXT,
+        row_key TEXT,
+        row_hash BYTEA NOT NULL,
+        PRIMARY KEY (table_name, row_key)
+    )
+"""
+
+
+def hash_row(row):
+    """16-byte content hash of a parsed CSV row."""
+    return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=16).digest()
+
+
+def hash_csv_rows(csv_path, key_index):
+    """
+    Hashes every row of a clean CSV file.
+
+    Args:
+        csv_path (str): Path to the CSV file (with header).
+        key_index (int): Position of the key column.
+
+    Returns:
+        dict: Key (as in the file) -> row hash.
+    """
+    with open(csv_path, mode="r", newline="", encoding="utf-8") as infile:
+        reader = csv.reader(infile)
+        next(reader)  # Skip header
+        return {row[key_index]: hash_row(row) for row in reader}
+
+
+def load_row_hashes(conn, table):
+    """Returns the stored key -> row hash of a table, empty if it has none."""
+    conn.execute(CREATE_HASH_TABLE)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT row_key, row_hash FROM {HASH_TABLE} WHERE table_name = %s", (table,))
+        return {key: bytes(row_hash) for key, row_hash in cur}
+
+
+def save_row_hashes(conn, table, hashes, replace=False):
+    """
+    Stores row hashes of a table.
+
+    Args:
+        conn (psycopg.Connection): Connection, usually inside the load transaction.
+        table (str): Table name.
+        hashes (dict): Key -> row hash of the rows to store.
+        replace (bool): Remove all stored hashes of the table first.
+    """
+    conn.execute(CREATE_HASH_TABLE)
+    if replace:
+        conn.execute(f"DELETE FROM {HASH_TABLE} WHERE table_name = %s", (table,))
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {HASH_TABLE} (table_name, row_key, row_hash) FROM STDIN") as copy:
+            for key, row_hash in hashes.items():
+                copy.write_row((table, key, row_hash))
+
+
+def delete_row_hashes(conn, table, keys):
+    """Removes the stored hashes of some keys of a table."""
+    if keys:
+        conn.execute(f"DELETE FROM {HASH_TABLE} WHERE table_name = %s AND row_key = ANY(%s)", (table, list(keys)))
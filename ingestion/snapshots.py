@@ -0,0 +1,139 @@
+import argparse
+import datetime
+import os
+import time
+
+import psycopg
+
+from bulk_load import CLEAN_DATA_DIR, COPY_BLOCK_SIZE, DSN, TABLES
+
+# Creates routes_history and its functions; also run on first use against a
+# database that was initialized before the script existed
+SNAPSHOTS_SQL = os.path.join(CLEAN_DATA_DIR, "snapshots.sql")
+PARENT_TABLE = "routes_history"
+
+
+def partition_name(snapshot_date):
+    """Name of the partition that holds a snapshot, as in attach_routes_snapshot."""
+    return f"routes_{snapshot_date:%Y%m%d}"
+
+
+def ensure_snapshot_schema(conn):
+    """Runs clean_data/snapshots.sql if routes_history does not exist yet."""
+    if conn.execute("SELECT to_regclass(%s) IS NULL", (PARENT_TABLE,)).fetchone()[0]:
+        with open(SNAPSHOTS_SQL, mode="r", encoding="utf-8") as infile:
+            conn.execute(infile.read())
+        conn.commit()
+
+
+def _copy_routes_csv(conn, table, csv_path):
+    """Streams a routes CSV file (with header, as in clean_data) into a table."""
+    definition = TABLES["routes"]
+    options = "FORMAT csv, HEADER true"
+    if definition["null"] is not None:
+        options += f", NULL '{definition['null']}'"
+    with conn.cursor() as cur:
+        with cur.copy(f"COPY {table} FROM STDIN WITH ({options})") as copy:
+            with open(csv_path, mode="rb") as infile:
+                while block := infile.read(COPY_BLOCK_SIZE):
+                    copy.write(block)
+
+
+def load_snapshot(dsn, snapshot_date, label, routes_csv=None, by_region=False):
+    """
+    Attaches a set of routes to routes_history as the snapshot of a date. The
+    routes are copied into a new partition that is attached once it is complete,
+    in one transaction, so the other snapshots stay readable throughout.
+
+    Args:
+        dsn (str): PostgreSQL connection string.
+        snapshot_date (datetime.date): Date of the snapshot, e.g. the first day of its period.
+        label (str): Human-readable name of the snapshot, e.g. '2023 Q1'.
+        routes_csv (str): Routes CSV file with the columns of clean_data/routes.csv,
+            or None to store the current routes table.
+        by_region (bool): Sub-partition the snapshot by the region of the source airport.
+
+    Returns:
+        int: Number of routes in the snapshot.
+    """
+    start = time.perf_counter()
+    with psycopg.connect(dsn) as conn:
+        ensure_snapshot_schema(conn)
+        with conn.transaction():
+            source_table = "routes"
+            if routes_csv is not None:
+                source_table = "snapshot_routes"
+                conn.execute(f"CREATE TEMP TABLE {source_table} ({TABLES['routes']['columns']}) ON COMMIT DROP")
+                _copy_routes_csv(conn, source_table, routes_csv)
+            rows = conn.execute("SELECT attach_routes_snapshot(%s, %s, %s::regclass, %s)",
+                                (snapshot_date, label, source_table, by_region)).fetchone()[0]
+    print(f"Attached {rows} routes as snapshot {snapshot_date} ({label}) in {time.perf_counter() - start:.2f}s")
+    return rows
+
+
+def retire_snapshot(dsn, snapshot_date, drop=False):
+    """
+    Detaches the partition of a snapshot from routes_history. The detach runs
+    CONCURRENTLY, so queries on the other snapshots are not blocked. The detached
+    table is kept as a standalone archive unless drop is set; it can be attached
+    again with ALTER TABLE routes_history ATTACH PARTITION.
+
+    Args:
+        dsn (str): PostgreSQL connection string.
+        snapshot_date (datetime.date): Date of the snapshot.
+        drop (bool): Drop the detached table.
+    """
+    partition = partition_name(snapshot_date)
+    # DETACH ... CONCURRENTLY cannot run inside a transaction block
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition} CONCURRENTLY")
+        with conn.transaction():
+            conn.execute('DELETE FROM route_snapshots WHERE "Snapshot_date" = %s', (snapshot_date,))
+            conn.execute("SELECT record_routes_history_version()")
+            if drop:
+                conn.execute(f"DROP TABLE {partition}")
+    print(f"Retired snapshot {snapshot_date}" + (" and dropped its routes" if drop else f", archived as {partition}"))
+
+
+def list_snapshots(dsn):
+    """
+    Returns the attached snapshots, oldest first.
+
+    Returns:
+        list: (snapshot date, label, by region, row count, loaded at) tuples.
+    """
+    with psycopg.connect(dsn) as conn:
+        ensure_snapshot_schema(conn)
+        return conn.execute(
+            'SELECT "Snapshot_date", "Label", "By_region", "Row_count", "Loaded_at" '
+            'FROM route_snapshots ORDER BY "Snapshot_date"'
+        ).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attach and retire route snapshots in routes_history.")
+    parser.add_argument("--dsn", default=DSN, help="PostgreSQL connection string")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load_parser = commands.add_parser("load", help="attach a snapshot of the routes")
+    load_parser.add_argument("--date", required=True, type=datetime.date.fromisoformat, help="snapshot date (YYYY-MM-DD)")
+    load_parser.add_argument("--label", required=True, help="name of the snapshot, e.g. '2023 Q1'")
+    load_parser.add_argument("--routes", help="routes CSV file (default: the current routes table)")
+    load_parser.add_argument("--by-region", action="store_true", help="sub-partition by source region")
+
+    retire_parser = commands.add_parser("retire", help="detach the partition of a snapshot")
+    retire_parser.add_argument("--date", required=True, type=datetime.date.fromisoformat, help="snapshot date (YYYY-MM-DD)")
+    retire_parser.add_argument("--drop", action="store_true", help="drop the detached table instead of keeping it")
+
+    commands.add_parser("list", help="list the attached snapshots")
+    args = parser.parse_args()
+
+    if args.command == "load":
+        load_snapshot(args.dsn, args.date, args.label, args.routes, args.by_region)
+    elif args.command == "retire":
+        retire_snapshot(args.dsn, args.date, args.drop)
+    else:
+        for snapshot in list_snapshots(args.dsn):
+            snapshot_date, label, by_region, row_count, loaded_at = snapshot
+            print(f"{snapshot_date}  {label:<20} {row_count:>8} routes"
+                  f"{'  by region' if by_region else ''}  loaded {loaded_at:%Y-%m-%d %H:%M}")
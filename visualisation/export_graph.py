@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROUTES_CSV = os.path.abspath(os.path.join(SCRIPT_DIR, "..", "clean_data", "routes.csv"))
+GRAPH_JSON = os.path.join(SCRIPT_DIR, "route_graph.json")
+
+TOP_AIRPORTS = 60
+MIN_ROUTE_WEIGHT = 2
+
+# Size of the area the precomputed layout is scaled to, in Cytoscape model coordinates
+LAYOUT_WIDTH = 1600
+LAYOUT_HEIGHT = 1200
+
+
+def count_routes(routes_file_path):
+    """
+    Counts how many routes touch every airport code and how many routes connect
+    every unordered pair of codes, skipping routes without codes and routes from
+    an airport to itself.
+
+    Args:
+        routes_file_path (str): Path to the clean routes CSV file.
+
+    Returns:
+        tuple: (airport codes ordered by route count, highest first, with ties in
+        order of first appearance; their route counts; DataFrame with source,
+        target and weight per airport pair, source < target)
+    """
+    routes_df = pd.read_csv(routes_file_path, usecols=["Source airport", "Destination airport"],
+                            dtype=str, keep_default_na=False)
+    sources = routes_df["Source airport"].str.strip().to_numpy()
+    targets = routes_df["Destination airport"].str.strip().to_numpy()
+    valid = (sources != "") & (targets != "") & (sources != targets)
+    sources, targets = sources[valid], targets[valid]
+
+    codes, first_seen, counts = np.unique(np.column_stack([sources, targets]).ravel(),
+                                          return_index=True, return_counts=True)
+    order = np.lexsort((first_seen, -counts))
+
+    pairs = pd.DataFrame({"source": np.minimum(sources, targets), "target": np.maximum(sources, targets)})
+    edges = pairs.groupby(["source", "target"], sort=False).size().rename("weight").reset_index()
+    return codes[order], counts[order], edges
+
+
+def force_layout(num_nodes, edge_index, weights, iterations=500, seed=0):
+    """
+    Fruchterman-Reingold force-directed layout: all nodes repel each other,
+    edges pull their ends together with a force that grows with the route weight.
+
+    Args:
+        num_nodes (int): Number of nodes.
+        edge_index (np.ndarray): (num_edges, 2) node indices of the edges.
+        weights (np.ndarray): Weight per edge.
+        iterations (int): Number of iterations.
+        seed (int): Seed for the initial positions, so the layout is reproducible.
+
+    Returns:
+        np.ndarray: (num_nodes, 2) positions in [0, 1].
+    """
+    rng = np.random.default_rng(seed)
+    positions = rng.random((num_nodes, 2))
+    if num_nodes < 2:
+        return positions
+    k = np.sqrt(1.0 / num_nodes)
+    strength = np.asarray(weights, dtype=np.float64) / max(np.max(weights, initial=1), 1)
+    temperature = 0.1
+    for _ in range(iterations):
+        delta = positions[:, None, :] - positions[None, :, :]
+        distance = np.maximum(np.linalg.norm(delta, axis=-1), 1e-4)
+        displacement = (delta * (k * k / distance ** 2)[..., None]).sum(axis=1)
+
+        edge_delta = positions[edge_index[:, 0]] - positions[edge_index[:, 1]]
+        edge_distance = np.maximum(np.linalg.norm(edge_delta, axis=-1), 1e-4)
+        pull = edge_delta * (edge_distance * (1 + strength) / k)[:, None]
+        np.subtract.at(displacement, edge_index[:, 0], pull)
+        np.add.at(displacement, edge_index[:, 1], pull)
+
+        length = np.maximum(np.linalg.norm(displacement, axis=-1), 1e-9)
+        positions += displacement / length[:, None] * np.minimum(length, temperature)[:, None]
+        temperature *= 0.99
+
+    positions -= positions.min(axis=0)
+    return positions / np.maximum(positions.max(axis=0), 1e-9)
+
+
+def export_graph(routes_file_path=ROUTES_CSV, output_file_path=GRAPH_JSON,
+                 top_airports=TOP_AIRPORTS, min_route_weight=MIN_ROUTE_WEIGHT):
+    """
+    Writes the graph shown by routesVisualisation.html: the top airports by
+    number of routes, the routes between them with at least min_route_weight
+    routes per airport pair, and a precomputed layout. The page only downloads
+    this file, so its load time does not depend on the size of routes.csv.
+
+    Args:
+        routes_file_path (str): Path to the clean routes CSV file.
+        output_file_path (str): Path to the JSON graph file.
+        top_airports (int): Number of airports to keep.
+        min_route_weight (int): Minimum number of routes for an airport pair to be drawn.
+
+    Returns:
+        dict: The exported graph, or None if the export failed.
+    """
+    try:
+        codes, counts, edges = count_routes(routes_file_path)
+    except FileNotFoundError:
+        print(f"Error: File not found at {routes_file_path}")
+        return None
+
+    top_codes = codes[:top_airports]
+    node_index = {code: idx for idx, code in enumerate(top_codes)}
+    edges = edges[(edges["weight"] >= min_route_weight)
+                  & edges["source"].isin(node_index) & edges["target"].isin(node_index)]
+    edge_index = np.column_stack([edges["source"].map(node_index), edges["target"].map(node_index)]).astype(np.int64)
+    positions = force_layout(len(top_codes), edge_index.reshape(-1, 2), edges["weight"].to_numpy())
+
+    graph = {
+        "top_airports": top_airports,
+        "min_route_weight": min_route_weight,
+        "nodes": [
+            {"id": code, "freq": int(freq),
+             "x": round(float(x) * LAYOUT_WIDTH, 1), "y": round(float(y) * LAYOUT_HEIGHT, 1)}
+            for code, freq, (x, y) in zip(top_codes, counts[:top_airports], positions)
+        ],
+        "edges": [
+            {"source": source, "target": target, "weight": int(weight)}
+            for source, target, weight in edges.itertuples(index=False)
+        ],
+    }
+    tmp_output_file_path = output_file_path + ".tmp"
+    with open(tmp_output_file_path, mode="w", encoding="utf-8") as outfile:
+        json.dump(graph, outfile, separators=(",", ":"))
+    os.replace(tmp_output_file_path, output_file_path)
+
+    print(f"Graph with {len(graph['nodes'])} airports and {len(graph['edges'])} routes written to {output_file_path}")
+    return graph
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the graph shown by routesVisualisation.html.")
+    parser.add_argument("--routes", default=ROUTES_CSV, help="clean routes CSV file")
+    parser.add_argument("--output", default=GRAPH_JSON, help="output JSON file")
+    parser.add_argument("--top-airports", type=int, default=TOP_AIRPORTS)
+    parser.add_argument("--min-route-weight", type=int, default=MIN_ROUTE_WEIGHT)
+    args = parser.parse_args()
+
+    export_graph(args.routes, args.output, args.top_airports, args.min_route_weight)
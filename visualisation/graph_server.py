@@ -0,0 +1,249 @@
+import argparse
+import functools
+import json
+import os
+import sys
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPT_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "analysis"))
+# Only the page and its data are served, not the rest of the checkout
+STATIC_DIR = os.path.join(REPO_DIR, "visualisation")
+
+from route_graph import CLEAN_DATA_DIR, RouteGraph, bfs_legs, load_route_graph  # noqa: E402
+
+HOST = "127.0.0.1"
+CACHE_SIZE = 1024
+MAX_DEPTH = 3
+DEFAULT_LIMIT = 200
+
+
+class GraphIndex:
+    """
+    In-memory index of the route network for the visualisation. Routes are
+    merged into undirected weighted edges (weight = number of routes between
+    two airports in either direction), like the page draws them. Airports are
+    identified by the code the routes use (IATA, else ICAO) or by Airport_ID.
+    """
+
+    def __init__(self, clean_data_dir=CLEAN_DATA_DIR, cache_size=CACHE_SIZE):
+        self.graph = load_route_graph(clean_data_dir)
+        airports_df = pd.read_csv(os.path.join(clean_data_dir, "airports.csv"),
+                                  usecols=["Airport ID", "IATA", "ICAO"], dtype={"IATA": str, "ICAO": str})
+        airports_df = airports_df.set_index("Airport ID").reindex(self.graph.airport_ids)
+        codes = airports_df["IATA"].fillna(airports_df["ICAO"])
+        self.codes = np.where(codes.isna(), self.graph.airport_ids.astype(str), codes).astype(object)
+        self.index_by_key = {key: idx for idx, key in enumerate(self.codes)}
+        for idx, (iata, icao) in enumerate(zip(airports_df["IATA"], airports_df["ICAO"])):
+            for key in (iata, icao):
+                if isinstance(key, str):
+                    self.index_by_key.setdefault(key, idx)
+
+        # Airlines by the code the routes use, then by IATA, ICAO and Airline_ID
+        route_airlines = pd.read_csv(os.path.join(clean_data_dir, "routes.csv"), usecols=["Airline", "Airline ID"],
+                                     dtype={"Airline": str}).drop_duplicates("Airline")
+        self.airline_ids = dict(zip(route_airlines["Airline"], route_airlines["Airline ID"]))
+        airlines_df = pd.read_csv(os.path.join(clean_data_dir, "airlines.csv"),
+                                  usecols=["Airline ID", "IATA", "ICAO"], dtype={"IATA": str, "ICAO": str})
+        for airline_id, iata, icao in airlines_df.itertuples(index=False):
+            for key in (iata, icao, str(airline_id)):
+                if isinstance(key, str):
+                    self.airline_ids.setdefault(key, airline_id)
+
+        self.undirected, self.weights = self._merge_routes(self.graph.edge_sources(), self.graph.indices)
+        # Routes touching each airport, as the page counts them
+        self.freq = np.bincount(self.undirected.edge_sources(), weights=self.weights,
+                                minlength=self.graph.num_airports).astype(np.int64)
+        self.cached_query = functools.lru_cache(maxsize=cache_size)(self._query)
+
+    def _merge_routes(self, sources, targets):
+        """
+        Merges routes into an undirected CSR graph with one edge per airport pair
+        in each direction, leaving out routes from an airport to itself.
+
+        Returns:
+            tuple: (RouteGraph, number of routes per edge)
+        """
+        n = self.graph.num_airports
+        keep = sources != targets
+        low, high = np.minimum(sources[keep], targets[keep]), np.maximum(sources[keep], targets[keep])
+        pairs, weights = np.unique(low.astype(np.int64) * n + high, return_counts=True)
+        low, high = np.divmod(pairs, n)
+        rows = np.concatenate([low, high])
+        order = np.argsort(rows, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+        undirected = RouteGraph(self.graph.airport_ids, self.graph.airport_names, self.graph.country_codes,
+                                self.graph.country_names, indptr,
+                                np.concatenate([high, low])[order].astype(np.int32), None, None)
+        return undirected, np.concatenate([weights, weights])[order]
+
+    def resolve_airport(self, key):
+        """
+        Dense index of an airport given its code or Airport_ID.
+
+        Raises:
+            KeyError: If the airport is unknown.
+        """
+        if key in self.index_by_key:
+            return self.index_by_key[key]
+        if key.isdigit():
+            return int(self.graph.airport_index(int(key))[0])
+        raise KeyError(f"Unknown airport {key!r}")
+
+    def _payload(self, node_idx, edge_sources, edge_targets, edge_weights, **extra):
+        graph = self.graph
+        return {
+            **extra,
+            "nodes": [
+                {"id": self.codes[idx], "airport_id": int(graph.airport_ids[idx]), "label": self.codes[idx],
+                 "name": graph.airport_names[idx], "country": graph.country_names[graph.country_codes[idx]]
+                 if graph.country_codes[idx] >= 0 else None, "freq": int(self.freq[idx])}
+                for idx in node_idx
+            ],
+            "edges": [
+                {"source": self.codes[source], "target": self.codes[target], "weight": int(weight)}
+                for source, target, weight in zip(edge_sources, edge_targets, edge_weights)
+            ],
+        }
+
+    def _edges_within(self, node_idx):
+        """Undirected edges between the given airports, each pair once."""
+        undirected = self.undirected
+        starts, ends = undirected.indptr[node_idx], undirected.indptr[node_idx + 1]
+        positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)]
+                                   or [np.empty(0, dtype=np.int64)]).astype(np.int64)
+        sources = np.repeat(node_idx, ends - starts)
+        targets = undirected.indices[positions]
+        keep = np.isin(targets, node_idx) & (sources < targets)
+        return sources[keep], targets[keep], self.weights[positions][keep]
+
+    def ego(self, airport_idx, depth=1, limit=DEFAULT_LIMIT):
+        """
+        Airports within depth connections of an airport (in either direction) and
+        the edges between them. With more than limit airports, the closest and
+        then busiest are kept.
+        """
+        legs = bfs_legs(self.undirected, [airport_idx], depth)
+        reached = np.flatnonzero(legs >= 0)
+        reached = reached[np.lexsort((-self.freq[reached], legs[reached]))][:limit]
+        sources, targets, weights = self._edges_within(np.sort(reached))
+        return self._payload(reached, sources, targets, weights,
+                             center=self.codes[airport_idx], depth=depth, truncated=bool((legs >= 0).sum() > limit))
+
+    def subgraph(self, airline=None, country=None, limit=DEFAULT_LIMIT * 5):
+        """
+        Routes of one airline and/or routes from or to one country, merged per
+        airport pair. With more than limit edges, the heaviest are kept.
+        """
+        graph = self.graph
+        sources, targets = graph.edge_sources(), graph.indices
+        keep = np.ones(graph.num_edges, dtype=bool)
+        if airline is not None:
+            if airline not in self.airline_ids:
+                raise KeyError(f"Unknown airline {airline!r}")
+            keep &= graph.edge_airline_ids == self.airline_ids[airline]
+        if country is not None:
+            in_country = np.zeros(graph.num_airports, dtype=bool)
+            in_country[graph.country_airports(country)] = True
+            keep &= in_country[sources] | in_country[targets]
+
+        merged, weights = self._merge_routes(sources[keep], targets[keep])
+        edge_sources = merged.edge_sources()
+        upper = edge_sources < merged.indices
+        edge_sources, edge_targets, weights = edge_sources[upper], merged.indices[upper], weights[upper]
+        heaviest = np.argsort(-weights, kind="stable")[:limit]
+        edge_sources, edge_targets, weights = edge_sources[heaviest], edge_targets[heaviest], weights[heaviest]
+        node_idx = np.unique(np.concatenate([edge_sources, edge_targets]))
+        return self._payload(node_idx, edge_sources, edge_targets, weights,
+                             airline=airline, country=country, truncated=bool(upper.sum() > limit))
+
+    def _query(self, kind, key, depth, limit, airline, country):
+        """Runs a query and returns the JSON response body; wrapped in an LRU cache."""
+        if kind == "ego":
+            result = self.ego(self.resolve_airport(key), depth, limit)
+        else:
+            result = self.subgraph(airline, country, limit)
+        return json.dumps(result, separators=(",", ":")).encode("utf-8")
+
+
+def make_handler(index):
+    """Request handler class that serves the API from index and all other paths as static files from STATIC_DIR."""
+
+    class GraphRequestHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=STATIC_DIR, **kwargs)
+
+        def send_head(self):
+            # Used by GET and HEAD; paths that resolve outside STATIC_DIR are not found
+            path = os.path.realpath(self.translate_path(self.path))
+            if os.path.commonpath([path, os.path.realpath(STATIC_DIR)]) != os.path.realpath(STATIC_DIR):
+                self.send_error(404, "File not found")
+                return None
+            return super().send_head()
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if not url.path.startswith("/api/"):
+                return super().do_GET()
+            params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            parts = [unquote(part) for part in url.path.split("/")[2:] if part]
+            try:
+                depth = min(max(int(params.get("depth", 1)), 1), MAX_DEPTH)
+                limit = max(int(params.get("limit", DEFAULT_LIMIT)), 1)
+                if len(parts) == 3 and parts[0] == "airports" and parts[2] in ("neighbors", "ego"):
+                    depth = 1 if parts[2] == "neighbors" else depth
+                    body = index.cached_query("ego", parts[1], depth, limit, None, None)
+                elif parts == ["subgraph"] and ("airline" in params or "country" in params):
+                    body = index.cached_query("subgraph", None, None, limit,
+                                              params.get("airline"), params.get("country"))
+                elif parts == ["cache"]:
+                    body = json.dumps(index.cached_query.cache_info()._asdict()).encode("utf-8")
+                else:
+                    return self.send_json_error(404, "Unknown endpoint")
+            except KeyError as e:
+                return self.send_json_error(404, e.args[0])
+            except ValueError:
+                return self.send_json_error(400, "depth and limit must be integers")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json_error(self, status, message):
+            body = json.dumps({"error": message}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return GraphRequestHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the visualisation and the route graph API.")
+    parser.add_argument("--host", default=HOST,
+                        help="interface to listen on, e.g. 0.0.0.0 to accept connections from other machines")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default=CLEAN_DATA_DIR, help="directory with the clean CSV files")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="number of cached query results")
+    args = parser.parse_args()
+
+    graph_index = GraphIndex(args.data_dir, args.cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(graph_index))
+    print(f"Serving http://{args.host}:{args.port}/routesVisualisation.html "
+          f"({graph_index.graph.num_edges} routes indexed)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()